@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+""" Time dispatching and watching many search jobs, serially with splunklib.client and concurrently
+with splunklib.asyncclient.
+
+mock_splunkd.py stands in for splunkd, each job being done --job-duration seconds after it is
+created, and each request delayed by --latency.  Both clients create --jobs jobs, wait for all of
+them, and read their results:
+
+  * serial:  client.Service, as an orchestration loop does without threads.  The jobs are created
+    one by one, then every pending job is polled in turn, sleeping --poll-interval between rounds,
+    and the results of each are read with Job.results and JSONResultsReader.
+  * async:   asyncclient.AsyncService with --concurrency requests in flight.  Each job is created,
+    waited for (polling every --poll-interval) and read by its own coroutine.
+
+Both must read every result of every job.  Requests and connections made are counted by the mock.
+
+    python bench/async_jobs.py [--jobs N] [--job-duration s] [--latency ms] [--concurrency N]
+"""
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+BIN = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bin")
+sys.path.insert(0, BIN)
+
+from splunklib import asyncclient, client
+from splunklib.results import JSONResultsReader, Message
+
+from corpora import CORPORA, generate
+from mock_splunkd import MockSplunkd
+from results_reader import build_results
+
+QUERY = "search index=main | head {}"
+
+
+def run_serial(server, args):
+    service = client.Service(scheme="http", host=server.host, port=server.port, token="mock", pool_size=1)
+    jobs = [service.jobs.create(QUERY.format(i)) for i in range(args.jobs)]
+    pending = list(jobs)
+    while pending:
+        pending = [job for job in pending if not job.is_done()]
+        if pending:
+            time.sleep(args.poll_interval)
+    counts = []
+    for job in jobs:
+        body = job.results(output_mode="json", count=0)
+        counts.append(sum(1 for item in JSONResultsReader(body) if not isinstance(item, Message)))
+        body.close()
+    service.http.close()
+    return counts
+
+
+async def run_async(server, args):
+    async def search(service, i):
+        job = await service.create_job(QUERY.format(i))
+        await job.wait(args.poll_interval)
+        return sum([1 async for item in job.results() if not isinstance(item, Message)])
+
+    async with asyncclient.AsyncService(scheme="http", host=server.host, port=server.port, token="mock",
+                                        max_concurrency=args.concurrency) as service:
+        return await asyncio.gather(*[search(service, i) for i in range(args.jobs)])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--jobs", type=int, default=200, help="search jobs to run (default: 200)")
+    parser.add_argument("--records", type=int, default=100, help="results of each job (default: 100)")
+    parser.add_argument("--corpus", choices=[name for (name, _) in CORPORA], default="cloudtrail")
+    parser.add_argument("--job-duration", type=float, default=2.0, help="seconds each job runs (default: 2)")
+    parser.add_argument("--latency", type=float, default=10, help="ms added to each request (default: 10)")
+    parser.add_argument("--poll-interval", type=float, default=0.5, help="seconds between polls (default: 0.5)")
+    parser.add_argument("--concurrency", type=int, default=asyncclient.DEFAULT_MAX_CONCURRENCY,
+                        help="requests in flight for the async client (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    results = build_results(generate(args.corpus, args.records))
+    server = MockSplunkd(results, latency=args.latency / 1000.0, job_duration=args.job_duration).start()
+    try:
+        times = {}
+        for (name, run) in (("serial", lambda: run_serial(server, args)),
+                            ("async", lambda: asyncio.run(run_async(server, args)))):
+            requests, connections = server.requests, server.connections
+            start = time.perf_counter()
+            counts = run()
+            times[name] = seconds = time.perf_counter() - start
+            if list(counts) != [len(results)] * args.jobs:
+                print("FAILED: {} did not read every result of every job".format(name))
+                return 1
+            print("{:<7} {:5} jobs  {:7.2f} s  {:6} requests  {:4} connections".format(
+                name, args.jobs, seconds, server.requests - requests, server.connections - connections))
+        print("async is {:.1f}x faster".format(times["serial"] / times["async"]))
+    finally:
+        server.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
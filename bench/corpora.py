@@ -0,0 +1,119 @@
+""" Synthetic JSON documents shaped like common Splunk sources, for the benchmarks.
+
+Each generator takes a random.Random, the document number and a size (the length of the lists in
+the document) and returns a document.
+"""
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import json
+import random
+
+
+def cloudtrail(rng, i, size):
+    account = "1234567890{:02d}".format(rng.randrange(100))
+    instances = ["i-{:017x}".format(rng.getrandbits(68)) for _ in range(size)]
+    return {
+        "eventVersion": "1.08",
+        "userIdentity": {
+            "type": "AssumedRole",
+            "principalId": "AROAEXAMPLE:user{}".format(i % 50),
+            "arn": "arn:aws:sts::{}:assumed-role/Admin/user{}".format(account, i % 50),
+            "accountId": account,
+            "sessionContext": {
+                "sessionIssuer": {"type": "Role", "arn": "arn:aws:iam::{}:role/Admin".format(account),
+                                  "userName": "Admin"},
+                "attributes": {"creationDate": "2021-03-01T12:00:00Z",
+                               "mfaAuthenticated": rng.choice(["true", "false"])}}},
+        "eventTime": "2021-03-01T12:{:02d}:{:02d}Z".format(i // 60 % 60, i % 60),
+        "eventSource": "ec2.amazonaws.com",
+        "eventName": rng.choice(["DescribeInstances", "StartInstances", "StopInstances", "RunInstances"]),
+        "awsRegion": rng.choice(["us-east-1", "us-west-2", "eu-west-1"]),
+        "sourceIPAddress": "10.{}.{}.{}".format(rng.randrange(256), rng.randrange(256), rng.randrange(256)),
+        "userAgent": "aws-cli/2.1.29 Python/3.8.8 Linux/5.4.0 botocore/2.0.0",
+        "requestParameters": {"instancesSet": {"items": [{"instanceId": x} for x in instances]},
+                              "filterSet": {}},
+        "responseElements": None,
+        "requestID": "{:032x}".format(rng.getrandbits(128)),
+        "eventID": "{:032x}".format(rng.getrandbits(128)),
+        "readOnly": rng.random() < 0.8,
+        "resources": [{"ARN": "arn:aws:ec2:us-east-1:{}:instance/{}".format(account, x), "accountId": account,
+                       "type": rng.choice(["AWS::EC2::Instance", "AWS::EC2::Volume"])} for x in instances],
+        "eventType": "AwsApiCall",
+        "managementEvent": True,
+        "recipientAccountId": account,
+        "eventCategory": "Management",
+    }
+
+
+def o365(rng, i, size):
+    targets = [{"Type": rng.choice([1, 2, 5]), "ID": "{:032x}".format(rng.getrandbits(128))} for _ in range(2)]
+    extended = [
+        {"Name": "additionalDetails", "Value": "{}"},
+        {"Name": "extendedAuditEventCategory", "Value": "Group"},
+        {"Name": "additionalTargets", "Value": json.dumps(targets)},
+    ] + [{"Name": "property{}".format(n), "Value": "value{}".format(rng.randrange(1000))} for n in range(size)]
+    return {
+        "CreationTime": "2021-03-01T12:{:02d}:{:02d}".format(i // 60 % 60, i % 60),
+        "Id": "{:032x}".format(rng.getrandbits(128)),
+        "Operation": rng.choice(["Add member to group.", "Update user.", "Add service principal."]),
+        "OrganizationId": "00000000-0000-0000-0000-000000000000",
+        "RecordType": 8,
+        "ResultStatus": "Success",
+        "UserKey": "{:016x}@contoso.com".format(rng.getrandbits(64)),
+        "UserType": 0,
+        "Version": 1,
+        "Workload": "AzureActiveDirectory",
+        "ObjectId": "group{}".format(i % 20),
+        "UserId": "user{}@contoso.com".format(i % 50),
+        "AzureActiveDirectoryEventType": 1,
+        "ExtendedProperties": extended,
+        "ModifiedProperties": [{"Name": "Group.Property{}".format(n), "NewValue": "[\"new{}\"]".format(n),
+                                "OldValue": "[]"} for n in range(size)],
+        "Actor": [{"ID": "user{}@contoso.com".format(i % 50), "Type": 5},
+                  {"ID": "{:032x}".format(rng.getrandbits(128)), "Type": 3}],
+        "ActorContextId": "00000000-0000-0000-0000-000000000000",
+        "Target": targets,
+        "relatedContent": [{"url": "https://portal.example.com/alert/{}/{}".format(i, n)} for n in range(size)],
+    }
+
+
+def kubernetes(rng, i, size):
+    containers = ["c{}".format(n) for n in rng.sample(range(size * 2), size)]
+    return {
+        "kind": "Pod",
+        "apiVersion": "v1",
+        "metadata": {
+            "name": "web-{:x}".format(rng.getrandbits(40)),
+            "namespace": rng.choice(["default", "kube-system", "prod"]),
+            "uid": "{:032x}".format(rng.getrandbits(128)),
+            "creationTimestamp": "2021-03-01T12:00:00Z",
+            "labels": {"app": rng.choice(["web", "api", "worker"]), "tier": "backend",
+                       "pod-template-hash": "{:x}".format(rng.getrandbits(32))},
+            "annotations": {"kubernetes.io/psp": "restricted"}},
+        "spec": {
+            "containers": [{
+                "name": name,
+                "image": "registry.example.com/{}:{}".format(name, rng.choice(["1.0", "1.1", "latest"])),
+                "resources": {"requests": {"cpu": "100m", "memory": "128Mi"}, "limits": {"memory": "256Mi"}},
+                "ports": [{"containerPort": 8080 + n, "protocol": "TCP"}],
+                "env": [{"name": "VAR{}".format(e), "value": "{}".format(rng.randrange(100))} for e in range(3)],
+            } for (n, name) in enumerate(containers)],
+            "nodeName": "node-{}".format(rng.randrange(10)),
+            "restartPolicy": "Always"},
+        "status": {
+            "phase": rng.choice(["Running", "Running", "Running", "Pending"]),
+            "podIP": "10.1.{}.{}".format(rng.randrange(256), rng.randrange(256)),
+            "containerStatuses": [{"name": name, "ready": rng.random() < 0.9, "restartCount": rng.randrange(5),
+                                   "image": "registry.example.com/{}".format(name)} for name in containers]},
+    }
+
+
+CORPORA = [("cloudtrail", cloudtrail), ("o365", o365), ("kubernetes", kubernetes)]
+
+
+def generate(corpus, count, size=5, seed=0):
+    """ Return `count` documents of the named corpus """
+    rng = random.Random(seed)
+    function = dict(CORPORA)[corpus]
+    return [function(rng, i, size) for i in range(count)]
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+""" Time export downloads through splunklib, with and without compressed transfer.
+
+A result set is served by mock_splunkd.py, throttled to --bandwidth to stand in for a remote
+splunkd, and downloaded from search/jobs/export through binding.Context, as client.Jobs.export
+does.  Each download is made with compress=False and compress=True, and is either read as raw
+bytes (--reader none, the transfer alone) or parsed with the results reader for the output mode.
+Both downloads must return the same bytes or results.
+
+    python bench/download.py [--records N] [--bandwidth MB/s] [--output-mode json|xml] [--reader results|none]
+"""
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import argparse
+import os
+import sys
+import time
+
+BIN = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bin")
+sys.path.insert(0, BIN)
+
+from splunklib import binding
+from splunklib.results import JSONResultsReader, Message, ResultsReader
+
+from corpora import CORPORA, generate
+from mock_splunkd import MockSplunkd
+from results_reader import build_results
+
+
+def download(server, compress, output_mode, reader):
+    """ Download the export and return (seconds, bytes received, content) """
+    context = binding.Context(scheme="http", host=server.host, port=server.port, token="mock",
+                              compress=compress)
+    sent = server.bytes_sent
+    start = time.perf_counter()
+    body = context.get("search/jobs/export", search="search *", output_mode=output_mode).body
+    if reader == "none":
+        parts = []
+        while True:
+            part = body.read(64 * 1024)
+            if not part:
+                break
+            parts.append(part)
+        content = b"".join(parts)
+    else:
+        reader_class = JSONResultsReader if output_mode == "json" else ResultsReader
+        content = [item if isinstance(item, Message) else dict(item) for item in reader_class(body)]
+    seconds = time.perf_counter() - start
+    body.close()
+    return seconds, server.bytes_sent - sent, content
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--records", type=int, default=20000, help="results in the export (default: 20000)")
+    parser.add_argument("--corpus", choices=[name for (name, _) in CORPORA], default="cloudtrail")
+    parser.add_argument("--bandwidth", type=float, default=50.0, help="MB/s, 0 for unlimited (default: 50)")
+    parser.add_argument("--output-mode", choices=["json", "xml"], default="json")
+    parser.add_argument("--reader", choices=["results", "none"], default="results",
+                        help="parse the results, or only read the bytes (default: results)")
+    parser.add_argument("--repeat", type=int, default=3, help="downloads of each kind (the best is kept)")
+    args = parser.parse_args(argv)
+
+    results = build_results(generate(args.corpus, args.records))
+    server = MockSplunkd(results, bandwidth=args.bandwidth * 1e6 or None).start()
+    try:
+        times = {}
+        expected = None
+        for compress in (False, True):
+            best = None
+            for _ in range(max(args.repeat, 1)):
+                seconds, received, content = download(server, compress, args.output_mode, args.reader)
+                best = seconds if best is None else min(best, seconds)
+            if expected is None:
+                expected = content
+            elif content != expected:
+                print("FAILED: the compressed download differs")
+                return 1
+            times[compress] = best
+            print("compress={:<5}  {:8.1f} MB transferred  {:7.3f} s  {:9,.0f} results/s".format(
+                str(compress), received / 1e6, best, len(results) / best))
+        print("compressed transfer is {:.1f}x {}".format(
+            max(times[False], times[True]) / min(times[False], times[True]),
+            "faster" if times[True] < times[False] else "slower"))
+    finally:
+        server.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
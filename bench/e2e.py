@@ -0,0 +1,330 @@
+#!/usr/bin/env python
+""" Run the search commands end to end, as subprocesses fed by a stand-in for splunkd.
+
+The driver speaks splunkd's side of both protocols:
+
+  * v1 (Intersplunk), for 'jmespath':  jpath.py is started with the command arguments and is sent a
+    header and CSV results on stdin.  Like splunkd does for legacy streaming commands, a new process
+    is started for each --chunk-size records.  jpath.py imports splunk.Intersplunk, which is the
+    stand-in from bench/splunk.
+  * v2 (chunked), for 'jsonformat':  one process for the whole search.  A getinfo request is
+    followed by one execute request per --chunk-size records, each framed as
+    'chunked 1.0,<metadata length>,<body length>\\n<metadata><body>'.  As with splunkd, the driver
+    waits for a response to each request before sending the next one.
+
+    python bench/e2e.py jsonformat --records 20000 --corpus cloudtrail --args "indent=2"
+    python bench/e2e.py jmespath --records 20000 --corpus o365 --args "output=url relatedContent[].url"
+    python bench/e2e.py all --repeat 3 --output results.json
+
+Records have the usual fields of an event (_time, host, source, sourcetype) and a JSON document in
+_raw, along with the empty '__mv_' columns that splunkd sends to commands supporting multivalues.
+For each run, wall time, CPU time (user + system) and peak RSS of the command's processes, and the
+bytes sent and received are reported.  Process start-up is included, as it is in a search.
+"""
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import argparse
+import csv
+import io
+import json
+import os
+import platform
+import shlex
+import subprocess
+import sys
+import threading
+import time
+
+try:
+    from queue import Queue
+except ImportError:
+    from Queue import Queue
+
+from corpora import CORPORA, generate
+from replay import getinfo_metadata, write_chunk, _header
+
+BENCH = os.path.dirname(os.path.abspath(__file__))
+BIN = os.path.join(os.path.dirname(BENCH), "bin")
+
+# name -> (script, protocol version)
+COMMANDS = {
+    "jmespath": ("jpath.py", 1),
+    "jsonformat": ("jsonformat.py", 2),
+}
+
+# Default 'jmespath' path for each corpus, when --args isn't given
+PATHS = {
+    "cloudtrail": "userIdentity.arn",
+    "o365": "relatedContent[].url",
+    "kubernetes": "spec.containers[].image",
+}
+
+FIELDS = ["_time", "host", "source", "sourcetype", "_raw"]
+
+# ru_maxrss is in kilobytes, except on macOS
+_MAXRSS_UNIT = 1 if sys.platform == "darwin" else 1024
+
+
+def build_rows(documents):
+    """ One row (in FIELDS order) per document """
+    return [[str(1614600000 + i), "host{}".format(i % 10), "/var/log/{}.json".format(i % 3), "_json",
+             json.dumps(document)] for (i, document) in enumerate(documents)]
+
+
+def encode_results(rows):
+    """ CSV results as splunkd sends them:  every field has an (empty) '__mv_' column """
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator="\n")
+    writer.writerow(FIELDS + ["__mv_" + name for name in FIELDS])
+    empty = [""] * len(FIELDS)
+    for row in rows:
+        writer.writerow(row + empty)
+    return out.getvalue().encode("utf-8")
+
+
+def count_results(body):
+    """ Number of results in a CSV body """
+    if not body:
+        return 0
+    return max(sum(1 for _ in csv.reader(io.StringIO(body.decode("utf-8")))) - 1, 0)
+
+
+class Usage(object):
+    """ Resource usage of the processes of one run """
+
+    def __init__(self):
+        self.processes = 0
+        self.cpu = 0.0
+        self.maxrss = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.results = 0
+        self.errors = []
+
+    def add(self, rusage):
+        self.processes += 1
+        self.cpu += rusage.ru_utime + rusage.ru_stime
+        self.maxrss = max(self.maxrss, rusage.ru_maxrss * _MAXRSS_UNIT)
+
+
+def spawn(script, args):
+    env = dict(os.environ)
+    # Let jpath.py find the splunk.Intersplunk stand-in
+    env["PYTHONPATH"] = os.pathsep.join(p for p in (BENCH, env.get("PYTHONPATH")) if p)
+    process = subprocess.Popen([sys.executable, script] + list(args), cwd=BIN, env=env, bufsize=0,
+                               stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    stderr = []
+    reader = threading.Thread(target=lambda: stderr.append(process.stderr.read()))
+    reader.daemon = True
+    reader.start()
+    return process, reader, stderr
+
+
+def reap(process, reader, stderr, usage):
+    """ Wait for the process, collecting its resource usage, which Popen.wait() doesn't give """
+    _, status, rusage = os.wait4(process.pid, 0)
+    process.returncode = os.WEXITSTATUS(status) if os.WIFEXITED(status) else -os.WTERMSIG(status)
+    reader.join()
+    usage.add(rusage)
+    if process.returncode != 0:
+        usage.errors.append("exit status {}: {}".format(
+            process.returncode, b"".join(stderr).decode("utf-8", "replace").strip()[-2000:]))
+
+
+def run_v1(script, args, rows, chunk_size, usage):
+    header = "splunkVersion:8.0.0\ntruncated:0\nallowStream:1\nsid:e2e\n\n".encode("utf-8")
+    for start in range(0, len(rows), chunk_size) or [0]:
+        data = header + encode_results(rows[start:start + chunk_size])
+        process, reader, stderr = spawn(script, args)
+        writer = threading.Thread(target=_write_and_close, args=(process.stdin, data))
+        writer.daemon = True
+        writer.start()
+        output = process.stdout.read()
+        writer.join()
+        reap(process, reader, stderr, usage)
+        usage.bytes_in += len(data)
+        usage.bytes_out += len(output)
+        if output.startswith(b"ERROR"):
+            usage.errors.append(output.decode("utf-8", "replace").strip())
+        usage.results += count_results(output)
+
+
+def _write_and_close(stream, data):
+    try:
+        stream.write(data)
+    except (IOError, OSError):
+        pass  # The command exited early; its error is in the output
+    _close(stream)
+
+
+def _close(stream):
+    try:
+        stream.close()
+    except (IOError, OSError):
+        pass
+
+
+def read_response(stream):
+    """ Read one chunk, returning (raw bytes, metadata, body), or None at the end of the output """
+    line = b"\n"
+    while line == b"\n":
+        line = stream.readline()  # splunklib writes a newline after its getinfo response
+    if not line:
+        return None
+    match = _header.match(line)
+    if match is None:
+        raise ValueError("Not a chunk header: {!r}".format(line[:100]))
+    metadata_length, body_length = int(match.group(1)), int(match.group(2))
+    metadata = _read_exactly(stream, metadata_length)
+    body = _read_exactly(stream, body_length)
+    return line + metadata + body, json.loads(metadata.decode("utf-8")) if metadata else {}, body
+
+
+def _read_exactly(stream, length):
+    parts = []
+    while length > 0:
+        part = stream.read(length)
+        if not part:
+            raise ValueError("Unexpected end of output")
+        parts.append(part)
+        length -= len(part)
+    return b"".join(parts)
+
+
+def _read_responses(stream, responses):
+    try:
+        while True:
+            response = read_response(stream)
+            responses.put(response)
+            if response is None:
+                break
+    except (IOError, OSError, ValueError) as e:
+        responses.put(e)
+
+
+def run_v2(script, args, rows, chunk_size, usage):
+    process, reader, stderr = spawn(script, [])
+    requests = [write_chunk(getinfo_metadata(args, chunk_size))]
+    starts = range(0, len(rows), chunk_size) or [0]
+    for start in starts:
+        finished = start + chunk_size >= len(rows)
+        requests.append(write_chunk({"action": "execute", "finished": finished},
+                                    encode_results(rows[start:start + chunk_size])))
+
+    # splunklib may answer a request with more than one chunk (a partial chunk is written once
+    # maxresultrows records are buffered), so output is read on its own thread, as splunkd does
+    responses = Queue()
+    output_reader = threading.Thread(target=_read_responses,
+                                     args=(io.BufferedReader(process.stdout), responses))
+    output_reader.daemon = True
+    output_reader.start()
+
+    def account(response):
+        if response is None or isinstance(response, Exception):
+            return False
+        data, metadata, body = response
+        usage.bytes_out += len(data)
+        usage.results += count_results(body)
+        for (level, text) in (metadata.get("inspector") or {}).get("messages", []):
+            if level in ("ERROR", "FATAL"):
+                usage.errors.append(text)
+        return True
+
+    response = None
+    try:
+        for (i, request) in enumerate(requests):
+            process.stdin.write(request)
+            process.stdin.flush()
+            usage.bytes_in += len(request)
+            response = responses.get()
+            if not account(response):
+                usage.errors.append("no response to request {}: {}".format(i, response or "end of output"))
+                break
+    except (IOError, OSError) as e:
+        usage.errors.append("protocol error: {}".format(e))
+    finally:
+        _close(process.stdin)
+        while response is not None and not isinstance(response, Exception):
+            response = responses.get()
+            account(response)
+        output_reader.join()
+        reap(process, reader, stderr, usage)
+
+
+def run(command, args, rows, chunk_size):
+    script, protocol = COMMANDS[command]
+    usage = Usage()
+    start = time.perf_counter()
+    if protocol == 1:
+        run_v1(script, args, rows, chunk_size, usage)
+    else:
+        run_v2(script, args, rows, chunk_size, usage)
+    return time.perf_counter() - start, usage
+
+
+def report(command, records, wall, usage):
+    print("{:<11} {:>8} records {:3} proc  {:7.3f} s wall  {:7.3f} s cpu  {:6.1f} MB rss  "
+          "{:8.1f} MB in  {:8.1f} MB out  {:9,.0f} records/s".format(
+              command, records, usage.processes, wall, usage.cpu, usage.maxrss / 1e6,
+              usage.bytes_in / 1e6, usage.bytes_out / 1e6, records / wall if wall else 0))
+    sys.stdout.flush()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("command", choices=sorted(COMMANDS) + ["all"])
+    parser.add_argument("--records", type=int, default=10000, help="records to send (default: 10000)")
+    parser.add_argument("--corpus", choices=[name for (name, _) in CORPORA], default="cloudtrail")
+    parser.add_argument("--size", type=int, default=5, help="length of the lists in each document (default: 5)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--args", help="command arguments (default: none for jsonformat, a path for the "
+                                       "corpus for jmespath)")
+    parser.add_argument("--chunk-size", type=int, default=50000,
+                        help="records per chunk, or per process for v1 (default: 50000)")
+    parser.add_argument("--repeat", type=int, default=1, help="runs of each command (the fastest is kept)")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    rows = build_rows(generate(args.corpus, args.records, args.size, args.seed))
+    commands = sorted(COMMANDS) if args.command == "all" else [args.command]
+    results = {}
+    failed = False
+
+    for command in commands:
+        if args.args is not None:
+            command_args = shlex.split(args.args)
+        elif command == "jmespath":
+            command_args = [PATHS[args.corpus]]
+        else:
+            command_args = []
+        best = None
+        for _ in range(max(args.repeat, 1)):
+            wall, usage = run(command, command_args, rows, args.chunk_size)
+            report(command, len(rows), wall, usage)
+            if usage.errors or usage.results != len(rows):
+                failed = True
+                print("    FAILED: {} of {} results returned{}".format(
+                    usage.results, len(rows), "".join("\n    " + error for error in usage.errors)))
+                break
+            if best is None or wall < best[0]:
+                best = (wall, usage)
+        if best is not None:
+            wall, usage = best
+            results[command] = {
+                "args": command_args, "wall": wall, "cpu": usage.cpu, "maxrss": usage.maxrss,
+                "processes": usage.processes, "bytes_in": usage.bytes_in, "bytes_out": usage.bytes_out,
+                "records_per_second": len(rows) / wall,
+            }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"python": platform.python_version(), "records": args.records, "corpus": args.corpus,
+                       "size": args.size, "seed": args.seed, "chunk_size": args.chunk_size,
+                       "results": results}, f, indent=2, sort_keys=True)
+            f.write("\n")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,224 @@
+#!/usr/bin/env python
+""" Benchmarks for the vendored jmespath package.
+
+Covers the lexer, the parser (cold, with an empty cache, and cached), evaluation with the
+TreeInterpreter and evaluation with the Specializer used by the 'jmespath' command.  Expressions
+are evaluated over synthetic documents shaped like AWS CloudTrail records, Office 365 management
+activity and Kubernetes pods.
+
+    python bench/engine.py [--docs N] [--size N] [--filter REGEX]
+    python bench/engine.py --output results.json
+    python bench/engine.py --baseline bench/engine_baseline.json [--threshold 0.10]
+    python bench/engine.py --compare before.json after.json [--threshold 0.10]
+
+Results are nanoseconds per operation (per expression for the lexer and parser, per document for
+evaluation), the best of --repeat runs.  With --baseline, the results are compared with those of a
+previous --output:  the percentage change of each case is printed, any result that is slower than
+the baseline by more than --threshold is flagged and the exit status is 1.  --compare does the same
+for two saved runs, without running anything.  On a busy machine, raise --repeat (or --threshold)
+before trusting a regression.
+
+bench/engine_baseline.json holds the results of the default settings, on the Python version noted
+in it.  Timings differ between machines:  regenerate it with --output on yours before comparing.
+
+The custom functions of the 'jmespath' command (unroll, from_string, ...) are defined in jpath.py,
+which imports splunk.Intersplunk.  Outside of Splunk, the stand-in in bench/splunk is used.
+"""
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import argparse
+import json
+import os
+import platform
+import re
+import sys
+import timeit
+
+BIN = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bin")
+sys.path.insert(0, BIN)
+
+import jmespath
+from jmespath.lexer import Lexer
+from jmespath.parser import Parser
+from jpath_specialize import Specializer
+
+from corpora import CORPORA, generate
+
+try:
+    from jpath import JmesPathSplunkExtraFunctions
+except ImportError:
+    JmesPathSplunkExtraFunctions = None
+
+
+# (name, corpus, expression).  The o365 expressions include the searchbnf.conf examples.
+EXPRESSIONS = [
+    ("ct_field", "cloudtrail", "eventName"),
+    ("ct_nested", "cloudtrail", "userIdentity.sessionContext.attributes.mfaAuthenticated"),
+    ("ct_projection", "cloudtrail", "requestParameters.instancesSet.items[].instanceId"),
+    ("ct_filter", "cloudtrail", "resources[?type=='AWS::EC2::Instance'].ARN"),
+    ("ct_sort_by", "cloudtrail", "sort_by(resources, &ARN)[0].ARN"),
+    ("ct_multiselect", "cloudtrail",
+     "{user: userIdentity.arn, event: eventName, region: awsRegion, ip: sourceIPAddress}"),
+    ("o365_example1", "o365", "relatedContent[].url"),
+    ("o365_example2", "o365", "ExtendedProperties[] | unroll(@,'Name','Value')"),
+    ("o365_example3", "o365", "ExtendedProperties[?Name=='additionalTargets'].Value | from_string(@)"),
+    ("o365_filter", "o365", "Actor[?Type==`5`].ID"),
+    ("o365_multiselect", "o365", "ModifiedProperties[].[Name, NewValue]"),
+    ("k8s_projection", "kubernetes", "spec.containers[].image"),
+    ("k8s_flatten", "kubernetes", "spec.containers[].env[].name"),
+    ("k8s_sort_by", "kubernetes", "sort_by(spec.containers, &name)[].name"),
+    ("k8s_filter", "kubernetes", "status.containerStatuses[?ready==`false`].name"),
+    ("k8s_max_by", "kubernetes", "max_by(status.containerStatuses, &restartCount).name"),
+    ("k8s_multiselect", "kubernetes",
+     "{name: metadata.name, ns: metadata.namespace, app: metadata.labels.app, phase: status.phase, "
+     "restarts: sum(status.containerStatuses[].restartCount)}"),
+]
+
+CUSTOM_FUNCTIONS = re.compile(r"\b(items|to_hash|from_string|unroll)\(")
+
+
+def best_time(function, repeat):
+    """ Seconds per call of `function`, best of `repeat` runs of at least 0.2 seconds each """
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def run_benchmarks(docs, size, seed, repeat, selected):
+    if JmesPathSplunkExtraFunctions is not None:
+        options = jmespath.Options(custom_functions=JmesPathSplunkExtraFunctions())
+    else:
+        options = jmespath.Options()
+
+    corpora = dict((name, generate(name, docs, size, seed)) for (name, _) in CORPORA)
+
+    results = {}
+    skipped = []
+
+    for (name, corpus, expression) in EXPRESSIONS:
+        if JmesPathSplunkExtraFunctions is None and CUSTOM_FUNCTIONS.search(expression):
+            skipped.append(name)
+            continue
+        documents = corpora[corpus]
+        parsed = jmespath.compile(expression)
+
+        def lex():
+            return list(Lexer().tokenize(expression))
+
+        def parse_cold():
+            Parser.purge()
+            return Parser().parse(expression)
+
+        def parse_cached():
+            return Parser().parse(expression)
+
+        def search():
+            search_document = parsed.search
+            for document in documents:
+                search_document(document, options)
+
+        def specialized():
+            search_document = Specializer(parsed, options=options).search
+            for document in documents:
+                search_document(document)
+
+        for (benchmark, function, per) in (("lex", lex, 1), ("parse_cold", parse_cold, 1),
+                                           ("parse_cached", parse_cached, 1), ("search", search, len(documents)),
+                                           ("specialized", specialized, len(documents))):
+            key = "{}/{}".format(benchmark, name)
+            if selected is not None and not selected.search(key):
+                continue
+            results[key] = best_time(function, repeat) / per * 1e9
+            print("{:<32} {:12.0f} ns".format(key, results[key]))
+            sys.stdout.flush()
+
+    Parser.purge()
+    return results, skipped
+
+
+def compare(results, baseline, threshold, all_keys=False):
+    """ Print the change of each result against the baseline and return the regressions.  With
+    'all_keys', benchmarks in only one of them are listed too.
+    """
+    regressions = []
+    print()
+    print("{:<32} {:>12} {:>12} {:>8}".format("benchmark", "baseline", "now", "change"))
+    for key in sorted(set(results) | set(baseline) if all_keys else results):
+        if key not in baseline or key not in results:
+            print("{:<32} {:>12} {:>12}".format(key, "-" if key not in baseline else "{:.0f}".format(baseline[key]),
+                                                "-" if key not in results else "{:.0f}".format(results[key])))
+            continue
+        change = results[key] / baseline[key] - 1
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions.append(key)
+        print("{:<32} {:12.0f} {:12.0f} {:+7.1%}{}".format(key, baseline[key], results[key], change, flag))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--docs", type=int, default=1000, help="documents per corpus (default: 1000)")
+    parser.add_argument("--size", type=int, default=5, help="length of the lists in each document (default: 5)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="runs of each benchmark (the best is kept)")
+    parser.add_argument("--filter", type=re.compile, help="only run benchmarks matching this regex")
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--baseline", help="compare with results from a previous --output")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"),
+                        help="compare the results of two previous --output runs, without running")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown (default: 0.10)")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        before, after = (load(filename) for filename in args.compare)
+        check_settings(before, after["docs"], after["size"])
+        regressions = compare(after["results"], before["results"], args.threshold, all_keys=True)
+        return report_regressions(regressions, args.threshold)
+
+    results, skipped = run_benchmarks(args.docs, args.size, args.seed, args.repeat, args.filter)
+    if skipped:
+        print("skipped (custom functions unavailable, jpath.py needs splunk.Intersplunk): " + ", ".join(skipped))
+
+    if args.output:
+        report = {
+            "python": platform.python_version(),
+            "jmespath": jmespath.__version__,
+            "docs": args.docs,
+            "size": args.size,
+            "seed": args.seed,
+            "unit": "ns",
+            "results": dict((key, round(value)) for (key, value) in results.items()),
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+            f.write("\n")
+
+    if args.baseline:
+        baseline = load(args.baseline)
+        check_settings(baseline, args.docs, args.size)
+        return report_regressions(compare(results, baseline["results"], args.threshold), args.threshold)
+    return 0
+
+
+def load(filename):
+    with open(filename) as f:
+        return json.load(f)
+
+
+def check_settings(baseline, docs, size):
+    if (baseline.get("docs"), baseline.get("size")) != (docs, size):
+        print("warning: baseline was run with --docs {} --size {}".format(baseline.get("docs"), baseline.get("size")))
+
+
+def report_regressions(regressions, threshold):
+    if regressions:
+        print("FAILED: {} regression(s) over {:.0%}".format(len(regressions), threshold))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+""" Report the import time of the search command modules.
+
+Every search that runs 'jsonformat' starts a new Python process, so module import time is paid on
+each search head and indexer for every search.  This script imports each module in a fresh
+interpreter with ``python -X importtime``, keeps the best of several runs, and fails when
+splunklib.searchcommands pulls in a module that should only be imported on first use (as
+tests/test_import_time.py does).
+
+    python bench/import_time.py [--repeat N]
+
+Timings vary too much with the machine and its load to fail on; compare them before and after a
+change on the same machine.
+"""
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+BIN = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bin")
+
+MODULES = [
+    "splunklib.searchcommands",
+    "jmespath",
+]
+
+# Modules that must not be imported by just importing splunklib.searchcommands
+LAZY = [
+    "splunklib.client",
+    "splunklib.binding",
+    "ssl",
+    "http.client",
+    "xml.etree",
+    "gzip",
+]
+
+_importtime = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|(\s+)(\S+)")
+
+
+def import_times(module):
+    """ Import `module` in a fresh interpreter and return {module: cumulative microseconds} """
+    output = subprocess.check_output(
+        [sys.executable, "-X", "importtime", "-c", "import " + module],
+        cwd=BIN, stderr=subprocess.STDOUT, universal_newlines=True)
+    times = {}
+    for line in output.splitlines():
+        match = _importtime.match(line)
+        if match:
+            times[match.group(4)] = int(match.group(2))
+    return times
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--repeat", type=int, default=10, help="runs per module (best is kept)")
+    args = parser.parse_args(argv)
+
+    failures = []
+    for module in MODULES:
+        runs = [import_times(module) for _ in range(args.repeat)]
+        best = min(run[module] for run in runs) / 1000.0
+        print("{:<28} {:8.1f} ms".format(module, best))
+        if module == "splunklib.searchcommands":
+            loaded = [name for name in LAZY if name in runs[0]]
+            for name in loaded:
+                print("    imported eagerly: {}".format(name))
+                failures.append("{} imported {}".format(module, name))
+
+    if failures:
+        print("FAILED: " + "; ".join(failures))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,325 @@
+#!/usr/bin/env python
+""" A local stand-in for splunkd's REST API, for exercising and benchmarking splunklib's HTTP layer.
+
+Serves a fixed result set over HTTP/1.1 with keep-alive:
+
+    POST   /services/auth/login                   a session key (any credentials)
+    GET    /services/search/jobs/export           the whole result set, as an export stream
+    POST   /services/search/jobs                  a new job, which is done after --job-duration
+    GET    /services/search/jobs/<sid>            the job's state, as an Atom entry
+    POST   /services/search/jobs/<sid>/control    action=cancel cancels (and deletes) the job
+    DELETE /services/search/jobs/<sid>            deletes the job
+    GET    /services/search/jobs/<sid>/results    a page of the result set (count, offset)
+
+Results are XML, or JSON with output_mode=json, in the formats of results_reader.py.  Responses
+are compressed when the request accepts gzip or deflate (and --no-compression isn't given), and
+can be throttled to a bandwidth and delayed by a latency, to stand in for a remote splunkd.
+Encoded and compressed responses are cached, so that serving them costs little CPU in this
+process.
+
+    python bench/mock_splunkd.py [--port 8089] [--records N] [--bandwidth MB/s] [--latency ms] [--job-duration s]
+
+Every job returns the same result set.  Or, from a benchmark:
+
+    server = MockSplunkd(results, bandwidth=20e6).start()
+    service = client.Service(scheme="http", host=server.host, port=server.port, token="mock")
+    ...
+    server.stop()
+"""
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import argparse
+import json
+import re
+import sys
+import threading
+import time
+import zlib
+from xml.sax.saxutils import escape
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import parse_qs, urlsplit
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urlparse import parse_qs, urlsplit
+
+from corpora import CORPORA, generate
+from results_reader import build_results, encode_json, encode_xml
+
+_namespace = r"/(?:services|servicesNS/[^/]+/[^/]+)"
+
+
+def encode_page(results, offset, output_mode):
+    """ A page of results, as search/jobs/<sid>/results returns it """
+    if output_mode == "json":
+        fields = [{"name": name} for name in (results[0] if results else [])]
+        return json.dumps({"preview": False, "init_offset": offset, "messages": [], "fields": fields,
+                           "results": results}, separators=(",", ":")).encode("utf-8")
+    return encode_xml(results, offset, messages=())
+
+
+def encode_job(sid, search, state):
+    """ search/jobs/<sid>, as an Atom entry with the job's state and its ACL """
+    keys = "".join('\n      <s:key name="{}">{}</s:key>'.format(name, escape(str(value)))
+                   for (name, value) in sorted(state.items()))
+    return ('<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<entry xmlns="http://www.w3.org/2005/Atom" xmlns:s="http://dev.splunk.com/ns/rest">\n'
+            '  <title>{search}</title>\n'
+            '  <id>/services/search/jobs/{sid}</id>\n'
+            '  <link href="/services/search/jobs/{sid}" rel="alternate"/>\n'
+            '  <link href="/services/search/jobs/{sid}/results" rel="results"/>\n'
+            '  <content type="text/xml">\n'
+            '    <s:dict>{keys}\n'
+            '      <s:key name="eai:acl">\n'
+            '        <s:dict>\n'
+            '          <s:key name="app">search</s:key>\n'
+            '          <s:key name="owner">admin</s:key>\n'
+            '          <s:key name="sharing">global</s:key>\n'
+            '        </s:dict>\n'
+            '      </s:key>\n'
+            '    </s:dict>\n'
+            '  </content>\n'
+            '</entry>\n').format(search=escape(search), sid=sid, keys=keys).encode("utf-8")
+
+
+def compress(data, encoding):
+    if encoding == "gzip":
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    else:
+        compressor = zlib.compressobj(6)
+    return compressor.compress(data) + compressor.flush()
+
+
+class MockSplunkd(ThreadingMixIn, HTTPServer):
+    """ splunkd stand-in.  Routes are (method, path regex, function(handler, match, query)). """
+    daemon_threads = True
+
+    def __init__(self, results, port=0, bandwidth=None, latency=0.0, compression=True, job_duration=0.0):
+        HTTPServer.__init__(self, ("127.0.0.1", port), _Handler)
+        self.results = results
+        self.bandwidth = bandwidth
+        self.latency = latency
+        self.compression = compression
+        self.job_duration = job_duration
+        self.jobs = {}
+        self.jobs_created = 0
+        self.connections = 0
+        self.requests = 0
+        self.bytes_sent = 0
+        self._cache = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self.routes = [
+            ("POST", re.compile(r"^/services/auth/login$"), self.login),
+            ("GET", re.compile(r"^%s/search/jobs/export$" % _namespace), self.export),
+            ("POST", re.compile(r"^%s/search/jobs/?$" % _namespace), self.create_job),
+            ("GET", re.compile(r"^%s/search/jobs/([^/]+)/?$" % _namespace), self.job),
+            ("POST", re.compile(r"^%s/search/jobs/([^/]+)/control$" % _namespace), self.control_job),
+            ("DELETE", re.compile(r"^%s/search/jobs/([^/]+)/?$" % _namespace), self.delete_job),
+            ("GET", re.compile(r"^%s/search/jobs/([^/]+)/results$" % _namespace), self.job_results),
+        ]
+
+    @property
+    def host(self):
+        return self.server_address[0]
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    @property
+    def url(self):
+        return "http://{}:{}".format(self.host, self.port)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def count(self, connections=0, requests=0, bytes_sent=0):
+        with self._lock:
+            self.connections += connections
+            self.requests += requests
+            self.bytes_sent += bytes_sent
+
+    def cached(self, key, function):
+        """ Encoded responses are the same every time; build each once """
+        try:
+            return self._cache[key]
+        except KeyError:
+            value = self._cache[key] = function()
+            return value
+
+    # Endpoints.  Each returns (status, content type, body, cache key).  With a cache key, the
+    # body is the same on every request and is only compressed once.
+
+    def login(self, handler, match, query):
+        return 200, "text/xml", b"<response>\n<sessionKey>mock</sessionKey>\n</response>\n", None
+
+    def export(self, handler, match, query):
+        output_mode = query.get("output_mode", "xml")
+        key = ("export", output_mode)
+        body = self.cached(key, lambda: (encode_json if output_mode == "json" else encode_xml)(self.results))
+        return 200, _content_type(output_mode), body, key
+
+    def create_job(self, handler, match, query):
+        with self._lock:
+            self.jobs_created += 1
+            sid = "mock_{}".format(self.jobs_created)
+            self.jobs[sid] = (query.get("search", ""), time.time())
+        return 201, "text/xml", "<response>\n  <sid>{}</sid>\n</response>\n".format(sid).encode("utf-8"), None
+
+    def job(self, handler, match, query):
+        sid = match.group(1)
+        try:
+            search, created = self.jobs[sid]
+        except KeyError:
+            return _not_found()
+        elapsed = time.time() - created
+        done = elapsed >= self.job_duration
+        progress = 1.0 if done else elapsed / self.job_duration
+        state = {
+            "sid": sid,
+            "dispatchState": "DONE" if done else "RUNNING",
+            "isDone": int(done),
+            "isFailed": 0,
+            "doneProgress": "{:.2f}".format(progress),
+            "resultCount": len(self.results) if done else int(len(self.results) * progress),
+        }
+        return 200, "text/xml", encode_job(sid, search, state), None
+
+    def control_job(self, handler, match, query):
+        if query.get("action") == "cancel":
+            return self.delete_job(handler, match, query)
+        if match.group(1) not in self.jobs:
+            return _not_found()
+        return 200, "text/xml", b"<response><messages><msg type=\"INFO\">OK</msg></messages></response>", None
+
+    def delete_job(self, handler, match, query):
+        with self._lock:
+            if self.jobs.pop(match.group(1), None) is None:
+                return _not_found()
+        return 200, "text/xml", b"<response><messages><msg type=\"INFO\">Search job cancelled.</msg></messages></response>", None
+
+    def job_results(self, handler, match, query):
+        output_mode = query.get("output_mode", "xml")
+        offset = int(query.get("offset", 0))
+        count = int(query.get("count", 100))
+        end = len(self.results) if count == 0 else offset + count
+        return 200, _content_type(output_mode), encode_page(self.results[offset:end], offset, output_mode), None
+
+
+def _not_found():
+    return 404, "text/xml", b"<response><messages><msg type=\"ERROR\">Not Found</msg></messages></response>", None
+
+
+def _content_type(output_mode):
+    return "application/json" if output_mode == "json" else "text/xml; charset=UTF-8"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def setup(self):
+        BaseHTTPRequestHandler.setup(self)
+        self.server.count(connections=1)
+
+    def do_GET(self):
+        self.dispatch("GET")
+
+    def do_POST(self):
+        self.dispatch("POST")
+
+    def do_DELETE(self):
+        self.dispatch("DELETE")
+
+    def dispatch(self, method):
+        server = self.server
+        server.count(requests=1)
+        url = urlsplit(self.path)
+        query = dict((k, v[-1]) for (k, v) in parse_qs(url.query).items())
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            form = self.rfile.read(length).decode("utf-8")
+            if "urlencoded" in (self.headers.get("Content-Type") or "application/x-www-form-urlencoded"):
+                query.update((k, v[-1]) for (k, v) in parse_qs(form).items())
+        if server.latency:
+            time.sleep(server.latency)
+
+        for (route_method, path, function) in server.routes:
+            match = path.match(url.path)
+            if match and route_method == method:
+                status, content_type, body, key = function(self, match, query)
+                break
+        else:
+            status, content_type, body, key = _not_found()
+        self.send_body(status, content_type, body, key)
+
+    def send_body(self, status, content_type, body, key=None):
+        server = self.server
+        accepted = [e.strip().split(";")[0] for e in (self.headers.get("Accept-Encoding") or "").split(",")]
+        encoding = next((e for e in ("gzip", "deflate") if e in accepted), None) if server.compression else None
+        if encoding and key is not None:
+            body = server.cached((key, encoding), lambda: compress(body, encoding))
+        elif encoding:
+            body = compress(body, encoding)
+
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        if (self.headers.get("Connection") or "").lower() == "close":
+            self.send_header("Connection", "close")
+            self.close_connection = True
+        self.end_headers()
+
+        server.count(bytes_sent=len(body))
+        if server.bandwidth:
+            start = time.time()
+            block = 64 * 1024
+            for position in range(0, len(body), block):
+                self.wfile.write(body[position:position + block])
+                delay = start + (position + block) / server.bandwidth - time.time()
+                if delay > 0:
+                    time.sleep(delay)
+        else:
+            self.wfile.write(body)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--records", type=int, default=10000, help="results in the result set (default: 10000)")
+    parser.add_argument("--corpus", choices=[name for (name, _) in CORPORA], default="cloudtrail")
+    parser.add_argument("--bandwidth", type=float, help="MB/s per connection (default: unlimited)")
+    parser.add_argument("--latency", type=float, default=0, help="ms added to each request")
+    parser.add_argument("--no-compression", action="store_true", help="never compress responses")
+    parser.add_argument("--job-duration", type=float, default=0, help="seconds until a job is done (default: 0)")
+    args = parser.parse_args(argv)
+
+    results = build_results(generate(args.corpus, args.records))
+    server = MockSplunkd(results, args.port, args.bandwidth * 1e6 if args.bandwidth else None,
+                         args.latency / 1000.0, not args.no_compression, args.job_duration)
+    print("serving {} results on {}".format(len(results), server.url))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+""" Time reading a large finished job's results a page at a time, one page after another and with
+Job.iter_results fetching several pages at once.
+
+mock_splunkd.py stands in for splunkd, serving the results of a finished job throttled to
+--bandwidth per connection and delayed by --latency.  The results are read:
+
+  * serial:    with Job.results(count, offset) and JSONResultsReader, one page after another, as
+               a script paging through a job does.
+  * parallel:  with Job.iter_results, --workers pages at once, through a connection pool of the
+               same size.
+
+Both must return the same results, in the same order.
+
+    python bench/paginated_results.py [--records N] [--page-size N] [--workers N] [--bandwidth MB/s]
+"""
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import argparse
+import os
+import sys
+import time
+
+BIN = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bin")
+sys.path.insert(0, BIN)
+
+from splunklib import client
+from splunklib.results import JSONResultsReader, Message
+
+from corpora import CORPORA, generate
+from mock_splunkd import MockSplunkd
+from results_reader import build_results
+
+
+def read_serial(job, page_size):
+    results = []
+    offset = 0
+    total = int(job.refresh()["resultCount"])
+    while offset < total:
+        body = job.results(output_mode="json", count=page_size, offset=offset)
+        results.extend(item for item in JSONResultsReader(body) if not isinstance(item, Message))
+        body.close()
+        offset += page_size
+    return results
+
+
+def read_parallel(job, page_size, workers):
+    return [item for item in job.iter_results(page_size, workers) if not isinstance(item, Message)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--records", type=int, default=200000, help="results of the job (default: 200000)")
+    parser.add_argument("--corpus", choices=[name for (name, _) in CORPORA], default="cloudtrail")
+    parser.add_argument("--page-size", type=int, default=10000, help="results per page (default: 10000)")
+    parser.add_argument("--workers", type=int, default=4, help="pages fetched at once (default: 4)")
+    parser.add_argument("--bandwidth", type=float, default=20.0,
+                        help="MB/s per connection, 0 for unlimited (default: 20)")
+    parser.add_argument("--latency", type=float, default=50, help="ms added to each request (default: 50)")
+    args = parser.parse_args(argv)
+
+    results = build_results(generate(args.corpus, args.records))
+    server = MockSplunkd(results, bandwidth=args.bandwidth * 1e6 or None, latency=args.latency / 1000.0).start()
+    try:
+        times = {}
+        for (name, workers) in (("serial", 1), ("parallel", args.workers)):
+            service = client.Service(scheme="http", host=server.host, port=server.port, token="mock",
+                                     pool_size=workers)
+            job = service.jobs.create("search index=main")
+            requests = server.requests
+            start = time.perf_counter()
+            if name == "serial":
+                items = read_serial(job, args.page_size)
+            else:
+                items = read_parallel(job, args.page_size, workers)
+            times[name] = seconds = time.perf_counter() - start
+            service.http.close()
+            if [dict(item) for item in items] != results:
+                print("FAILED: {} returned different results".format(name))
+                return 1
+            print("{:<9} {:2} workers  {:7.2f} s  {:4} requests  {:9,.0f} results/s".format(
+                name, workers, seconds, server.requests - requests, len(items) / seconds))
+        print("parallel is {:.1f}x faster".format(times["serial"] / times["parallel"]))
+    finally:
+        server.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
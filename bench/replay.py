@@ -0,0 +1,224 @@
+#!/usr/bin/env python
+""" Replay chunked (SCP v2) search command sessions in-process, outside of splunkd.
+
+Sessions come from recordings or are generated from a corpus of JSON documents:
+
+    # A session captured with 'record=true'.  The input is replayed and the output compared with
+    # the recorded output.
+    python bench/replay.py $SPLUNK_HOME/var/run/splunklib.searchcommands/recordings/JsonFormatCommand-<time>.getinfo
+
+    # A synthetic session:  one record per document, with the document in _raw
+    python bench/replay.py --corpus docs.jsonl --args "indent=2 order=sort" --chunk-size 50000
+
+The command runs in this process, so each run measures decoding, the command and encoding without
+process startup.  Records per second are reported for the best of --repeat runs.  Metric values in
+the inspector metadata hold timings, which differ from run to run.  They are left out of the
+comparison, which is otherwise byte for byte.
+
+Use --save <prefix> to write a synthetic session (and its output) in the recording layout, so it
+can be replayed later as a baseline.
+"""
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import argparse
+import csv
+import gzip
+import io
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+
+BIN = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bin")
+sys.path.insert(0, BIN)
+
+_header = re.compile(br"chunked\s+1.0\s*,\s*(\d+)\s*,\s*(\d+)\s*\n")
+
+
+def read_chunks(data):
+    """ Split a chunked protocol stream into a list of (metadata, body) pairs of bytes """
+    chunks = []
+    position = 0
+    while position < len(data):
+        if data[position:position + 1] == b"\n":
+            position += 1  # splunklib writes a newline after its getinfo response
+            continue
+        match = _header.match(data, position)
+        if match is None:
+            raise ValueError("No chunk header at offset {}".format(position))
+        metadata_length, body_length = int(match.group(1)), int(match.group(2))
+        position = match.end()
+        metadata = data[position:position + metadata_length]
+        position += metadata_length
+        chunks.append((metadata, data[position:position + body_length]))
+        position += body_length
+    return chunks
+
+
+def write_chunk(metadata, body=b""):
+    metadata = json.dumps(metadata, separators=(",", ":")).encode("utf-8")
+    return "chunked 1.0,{},{}\n".format(len(metadata), len(body)).encode("ascii") + metadata + body
+
+
+def count_records(chunks):
+    """ Count the records sent to the command in the execute chunks of a session """
+    count = 0
+    for (metadata, body) in chunks:
+        if body and json.loads(metadata.decode("utf-8")).get("action") == "execute":
+            count += max(sum(1 for _ in csv.reader(io.StringIO(body.decode("utf-8")))) - 1, 0)
+    return count
+
+
+def read_corpus(path):
+    """ Read JSON documents from a JSON array, or from a file with one document per line """
+    with io.open(path, encoding="utf-8") as f:
+        text = f.read()
+    if text.lstrip().startswith("["):
+        return [json.dumps(document) for document in json.loads(text)]
+    return [line for line in text.splitlines() if line.strip()]
+
+
+def getinfo_metadata(args, chunk_size, command="jsonformat"):
+    """ Metadata of the getinfo request that splunkd sends first """
+    return {
+        "action": "getinfo", "preview": False, "streaming_command_will_restart": False,
+        "searchinfo": {
+            "args": args, "raw_args": args, "dispatch_dir": tempfile.gettempdir(),
+            "sid": "replay", "app": "jmespath", "owner": "admin", "username": "admin",
+            "session_key": "", "splunkd_uri": "https://127.0.0.1:8089", "splunk_version": "8.0.0",
+            "search": "%7C%20" + command, "earliest_time": "0", "latest_time": "0",
+            "command": command, "maxresultrows": chunk_size}}
+
+
+def synthetic_session(documents, args, chunk_size, field="_raw", command="jsonformat"):
+    """ Build a session that sends one record per document, in chunks of `chunk_size` records """
+    session = [write_chunk(getinfo_metadata(args, chunk_size, command))]
+    starts = range(0, len(documents), chunk_size) or [0]
+    for start in starts:
+        body = io.StringIO()
+        writer = csv.writer(body, lineterminator="\n")
+        writer.writerow([field])
+        for document in documents[start:start + chunk_size]:
+            writer.writerow([document])
+        finished = start + chunk_size >= len(documents)
+        session.append(write_chunk({"action": "execute", "finished": finished}, body.getvalue().encode("utf-8")))
+    return b"".join(session)
+
+
+def load_command(path):
+    """ Import a search command script and return its SearchCommand class """
+    from importlib import import_module
+    from splunklib.searchcommands.search_command import SearchCommand
+    name = os.path.splitext(os.path.basename(path))[0]
+    sys.path.insert(0, os.path.dirname(os.path.abspath(path)))
+    module = import_module(name)  # dispatch() does nothing unless the script is __main__
+    for value in vars(module).values():
+        if isinstance(value, type) and issubclass(value, SearchCommand) and value.__module__ == module.__name__:
+            return value
+    raise ValueError("No search command class in {}".format(path))
+
+
+def run(command_class, session):
+    """ Run a command on a session, like splunkd would, and return (output, seconds) """
+    # Same as sys.stdin on POSIX:  text, without newline translation
+    ifile = io.TextIOWrapper(io.BytesIO(session), encoding="utf-8", newline="\n")
+    ofile = io.BytesIO()
+    command = command_class()
+    start = time.perf_counter()
+    try:
+        command.process([command_class.__name__], ifile, ofile)
+    except SystemExit:
+        pass
+    return ofile.getvalue(), time.perf_counter() - start
+
+
+def comparable(output):
+    """ Chunks of output with timing dependent metrics left out of the metadata """
+    chunks = []
+    for (metadata, body) in read_chunks(output):
+        metadata = json.loads(metadata.decode("utf-8")) if metadata else {}
+        inspector = metadata.get("inspector") or {}
+        for name in [name for name in inspector if name.startswith("metric.")]:
+            del inspector[name]
+        if "inspector" in metadata and not inspector:
+            del metadata["inspector"]
+        chunks.append((metadata, body))
+    return chunks
+
+
+def report_difference(expected, actual):
+    expected, actual = comparable(expected), comparable(actual)
+    if len(expected) != len(actual):
+        return "expected {} chunks, got {}".format(len(expected), len(actual))
+    for i, (e, a) in enumerate(zip(expected, actual)):
+        if e[0] != a[0]:
+            return "chunk {}: metadata differs: {!r} != {!r}".format(i, e[0], a[0])
+        if e[1] != a[1]:
+            offset = next((j for j, (x, y) in enumerate(zip(e[1], a[1])) if x != y), min(len(e[1]), len(a[1])))
+            return "chunk {}: body differs at byte {}: {!r} != {!r}".format(
+                i, offset, e[1][offset:offset + 40], a[1][offset:offset + 40])
+    return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("recording", nargs="?", help="recording prefix, or its .input.gz file")
+    parser.add_argument("--command", default=os.path.join(BIN, "jsonformat.py"), help="search command script")
+    parser.add_argument("--corpus", help="JSON array, or one JSON document per line, for a synthetic session")
+    parser.add_argument("--args", default="", help="command arguments for a synthetic session")
+    parser.add_argument("--field", default="_raw", help="field holding each document (default: _raw)")
+    parser.add_argument("--chunk-size", type=int, default=50000, help="records per chunk (default: 50000)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs (the best is reported)")
+    parser.add_argument("--save", metavar="PREFIX", help="save a synthetic session and its output")
+    args = parser.parse_args(argv)
+
+    if (args.recording is None) == (args.corpus is None):
+        parser.error("give either a recording or --corpus")
+
+    command_class = load_command(args.command)
+    expected = None
+
+    if args.recording:
+        prefix = re.sub(r"\.input(\.gz)?$", "", args.recording)
+        with gzip.open(prefix + ".input.gz", "rb") as f:
+            session = f.read()
+        if os.path.exists(prefix + ".output.gz"):
+            with gzip.open(prefix + ".output.gz", "rb") as f:
+                expected = f.read()
+    else:
+        documents = read_corpus(args.corpus)
+        session = synthetic_session(documents, args.args.split(), args.chunk_size, args.field)
+
+    records = count_records(read_chunks(session))
+    best = None
+    output = None
+
+    for _ in range(max(args.repeat, 1)):
+        output, seconds = run(command_class, session)
+        best = seconds if best is None else min(best, seconds)
+
+    print("{}: {} records, {} bytes in, {} bytes out".format(
+        command_class.__name__, records, len(session), len(output)))
+    print("best of {}: {:.3f} s, {:,.0f} records/s, {:.1f} MB/s in".format(
+        args.repeat, best, records / best, len(session) / best / 1e6))
+
+    if args.save:
+        for (suffix, data) in ((".input.gz", session), (".output.gz", output)):
+            with gzip.open(args.save + suffix, "wb") as f:
+                f.write(data)
+        print("saved {}.input.gz and {}.output.gz".format(args.save, args.save))
+
+    if expected is not None:
+        difference = report_difference(expected, output)
+        if difference is not None:
+            print("output DIFFERS from the recording: " + difference)
+            return 1
+        print("output matches the recording" + (" byte for byte" if output == expected else " (apart from metrics)"))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+""" Compare splunklib.results.ResultsReader (XML) with JSONResultsReader on the same result set.
+
+The result set is encoded as splunkd streams it from search/jobs/export, in both output modes:
+
+    output_mode=xml    <results preview='0'><meta>...</meta><messages>...</messages>
+                       <result offset='0'><field k='host'><value><text>...</text></value></field>...
+    output_mode=json   {"preview":false,"offset":0,"result":{"host":"...",...}}   (one per line)
+
+Each result has the usual fields of an event, a multivalue field and a JSON document in _raw.
+Both readers must return the same results and messages; their throughput is reported for the
+best of --repeat runs.
+
+    python bench/results_reader.py [--records N] [--corpus NAME] [--repeat N]
+"""
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import argparse
+import io
+import json
+import os
+import sys
+import time
+from xml.sax.saxutils import escape, quoteattr
+
+BIN = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bin")
+sys.path.insert(0, BIN)
+
+from splunklib.results import JSONResultsReader, Message, ResultsReader
+
+from corpora import CORPORA, generate
+
+MESSAGES = [("INFO", "Your timerange was substituted based on your search string"),
+            ("WARN", "Field 'x' does not exist in the data.")]
+
+
+def build_results(documents):
+    return [{
+        "_time": "2021-03-01T12:00:{:02d}.000+00:00".format(i % 60),
+        "host": "host{}".format(i % 10),
+        "source": "/var/log/{}.json".format(i % 3),
+        "sourcetype": "_json",
+        "tag": ["aws", "cloud", "audit"][:1 + i % 3] if i % 3 else "aws",
+        "_raw": json.dumps(document),
+    } for (i, document) in enumerate(documents)]
+
+
+def encode_xml(results, offset=0, messages=MESSAGES, preview=False):
+    fields = list(results[0]) if results else []
+    out = ["<?xml version='1.0' encoding='UTF-8'?>\n<results preview='{:d}'>\n<meta>\n<fieldOrder>\n".format(preview)]
+    out.extend("<field>{}</field>\n".format(escape(name)) for name in fields)
+    out.append("</fieldOrder>\n</meta>\n<messages>\n")
+    out.extend("  <msg type={}>{}</msg>\n".format(quoteattr(level), escape(text)) for (level, text) in messages)
+    out.append("</messages>\n")
+    for (offset, result) in enumerate(results, offset):
+        out.append("\t<result offset='{}'>\n".format(offset))
+        for (name, value) in result.items():
+            if name == "_raw":
+                out.append("\t\t<field k='_raw'><v xml:space='preserve' trunc='0'>{}</v></field>\n".format(
+                    escape(value)))
+                continue
+            out.append("\t\t<field k={}>\n".format(quoteattr(name)))
+            for v in value if isinstance(value, list) else [value]:
+                out.append("\t\t\t<value><text>{}</text></value>\n".format(escape(v)))
+            out.append("\t\t</field>\n")
+        out.append("\t</result>\n")
+    out.append("</results>\n")
+    return "".join(out).encode("utf-8")
+
+
+def encode_json(results, offset=0, messages=MESSAGES, preview=False):
+    """ An export stream:  one document per result """
+    messages = [{"type": level, "text": text} for (level, text) in messages]
+    out = [json.dumps({"preview": preview, "messages": messages}, separators=(",", ":")), "\n"]
+    last = offset + len(results) - 1
+    for (offset, result) in enumerate(results, offset):
+        document = {"preview": preview, "offset": offset, "result": result}
+        if offset == last:
+            document["lastrow"] = True
+        out.append(json.dumps(document, separators=(",", ":")))
+        out.append("\n")
+    return "".join(out).encode("utf-8")
+
+
+def read_all(reader_class, data):
+    reader = reader_class(io.BytesIO(data))
+    items = [item if isinstance(item, Message) else dict(item) for item in reader]
+    return items, reader.is_preview
+
+
+def best_time(reader_class, data, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        read_all(reader_class, data)
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--records", type=int, default=5000, help="results in the set (default: 5000)")
+    parser.add_argument("--corpus", choices=[name for (name, _) in CORPORA], default="cloudtrail")
+    parser.add_argument("--size", type=int, default=5, help="length of the lists in each document (default: 5)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs of each reader (the best is kept)")
+    args = parser.parse_args(argv)
+
+    results = build_results(generate(args.corpus, args.records, args.size))
+    streams = [("xml", ResultsReader, encode_xml(results)), ("json", JSONResultsReader, encode_json(results))]
+
+    expected = None
+    times = {}
+    for (name, reader_class, data) in streams:
+        items, is_preview = read_all(reader_class, data)
+        if expected is None:
+            expected = (items, is_preview)
+        elif (items, is_preview) != expected:
+            print("FAILED: {} returned different results than {}".format(reader_class.__name__, streams[0][1].__name__))
+            return 1
+        times[name] = seconds = best_time(reader_class, data, args.repeat)
+        print("{:<18} {:8.1f} MB  {:7.3f} s  {:9,.0f} results/s  {:6.1f} MB/s".format(
+            reader_class.__name__, len(data) / 1e6, seconds, len(results) / seconds, len(data) / seconds / 1e6))
+    print("JSONResultsReader is {:.1f}x faster".format(times["xml"] / times["json"]))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,168 @@
+""" Stand-in for splunk.Intersplunk, the legacy (v1) search command protocol.
+
+Implements the functions used by jpath.py, with the same behavior as Splunk's module:
+
+    splunkd                                     command
+    -------                                     -------
+    argv: the search command arguments
+    stdin: header lines ("key:value"),
+           a blank line, then CSV results   -->
+                                            <-- stdout: CSV results
+
+Multivalue fields are sent and received as in Splunk when 'supports_multivalues = true':  each
+field 'f' has a companion '__mv_f' column holding the values as "$value1$;$value2$", with '$'
+doubled inside values.  The '__mv_' column is empty for single values.
+"""
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import csv
+import re
+import sys
+
+MV_PREFIX = "__mv_"
+
+_option_name = re.compile(r"^\w+$")
+
+
+def getKeywordsAndOptions():
+    """ Split the command arguments into keywords and key=value options """
+    keywords = []
+    options = {}
+    for arg in sys.argv[1:]:
+        if arg in ("__GETINFO__", "__EXECUTE__"):
+            continue
+        name, equals, value = arg.partition("=")
+        if equals and _option_name.match(name):
+            options[name] = value
+        else:
+            keywords.append(arg)
+    return keywords, options
+
+
+def decodeMV(text):
+    """ "$a$;$b$" -> ["a", "b"] """
+    values = []
+    value = []
+    in_value = False
+    i = 0
+    while i < len(text):
+        c = text[i]
+        if not in_value:
+            if c == "$":
+                in_value = True
+            i += 1
+            continue
+        if c == "$":
+            if text[i + 1:i + 2] == "$":
+                value.append("$")
+                i += 2
+                continue
+            values.append("".join(value))
+            value = []
+            in_value = False
+        else:
+            value.append(c)
+        i += 1
+    return values
+
+
+def encodeMV(values):
+    """ ["a", "b"] -> "$a$;$b$" """
+    return ";".join("$" + value.replace("$", "$$") + "$" for value in values)
+
+
+def readResults(input_buf=None, settings=None, has_header=True):
+    """ Read the header (into `settings`) and the CSV results from stdin, or from `input_buf` """
+    if input_buf is None:
+        input_buf = sys.stdin
+    elif isinstance(input_buf, str):
+        input_buf = iter(input_buf.splitlines(True))
+
+    if has_header:
+        for line in input_buf:
+            line = line.rstrip("\r\n")
+            if not line:
+                break
+            if settings is not None:
+                name, _, value = line.partition(":")
+                settings[name] = value
+
+    results = []
+    reader = csv.reader(input_buf)
+    header = next(reader, None)
+    if header is None:
+        return results
+
+    columns = [(i, name) for (i, name) in enumerate(header) if not name.startswith(MV_PREFIX)]
+    position = dict((name, i) for (i, name) in enumerate(header))
+    multivalue = [(i, position[MV_PREFIX + name]) for (i, name) in columns if MV_PREFIX + name in position]
+    mv_index = dict(multivalue)
+
+    for row in reader:
+        result = {}
+        for (i, name) in columns:
+            value = row[i] if i < len(row) else ""
+            j = mv_index.get(i)
+            if j is not None and j < len(row) and row[j]:
+                result[name] = decodeMV(row[j])
+            elif value != "":
+                result[name] = value
+        results.append(result)
+    return results
+
+
+def getOrganizedResults(input_str=None):
+    """ Return (results, dummyresults, settings) """
+    settings = {}
+    results = readResults(input_str, settings, True)
+    return results, [], settings
+
+
+def outputResults(results, messages=None, fields=None, mvdelim="\n", outputfile=None):
+    """ Write results as CSV.  List values are written as multivalue fields. """
+    if results is None:
+        return
+    if outputfile is None:
+        outputfile = sys.stdout
+    if messages:
+        # Splunk shows these in the UI; here they are only reported
+        for (level, message) in sorted(messages.items()):
+            sys.stderr.write("{}: {}\n".format(level, message))
+
+    if fields is None:
+        fields = []
+        seen = set()
+        for result in results:
+            for name in result:
+                if name not in seen:
+                    seen.add(name)
+                    fields.append(name)
+    multivalue = set(name for result in results for (name, value) in result.items()
+                     if isinstance(value, (list, tuple)))
+
+    header = list(fields) + [MV_PREFIX + name for name in fields if name in multivalue]
+    writer = csv.writer(outputfile, lineterminator="\n")
+    writer.writerow(header)
+    for result in results:
+        row = []
+        mv_row = []
+        for name in fields:
+            value = result.get(name)
+            if isinstance(value, (list, tuple)):
+                values = ["" if v is None else str(v) for v in value]
+                row.append(mvdelim.join(values))
+                mv_row.append(encodeMV(values))
+            else:
+                row.append("" if value is None else value)
+                if name in multivalue:
+                    mv_row.append("")
+        writer.writerow(row + mv_row)
+    outputfile.flush()
+
+
+def generateErrorResults(errorStr):
+    """ Report an error to splunkd, which shows it and stops the search """
+    results = [{"ERROR": errorStr}]
+    outputResults(results)
+    return results
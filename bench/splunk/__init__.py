@@ -0,0 +1,4 @@
+""" Local stand-in for the parts of Splunk's Python library used by the app's commands.
+
+Only for running the commands outside of Splunk, from the benchmarks.  Not shipped with the app.
+"""
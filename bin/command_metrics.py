@@ -0,0 +1,76 @@
+""" Timing and throughput accounting shared by the 'jmespath' and 'jsonformat' search commands.
+
+Counters are kept for the current chunk and in total.  Counters ending in '_time' hold elapsed
+seconds.  Sizes ('bytes_in'/'bytes_out') are measured in characters to avoid encoding each value.
+Caches count '<cache>_hits' and '<cache>_misses'; the summary adds each cache's hit rate.
+"""
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+from collections import Counter
+
+try:
+    from time import perf_counter as timer
+except ImportError:
+    from time import time as timer
+
+
+# Metric name -> counters for (elapsed_seconds, invocation_count, input_count, output_count), the
+# layout of splunklib.searchcommands.SearchMetric.  None marks an unused position.
+SEARCH_METRICS = [
+    ("records",     (None, None, "records", None)),
+    ("decode",      ("decode_time", "decoded", "bytes_in", None)),
+    ("eval",        ("eval_time", "evaluated", None, None)),
+    ("encode",      ("encode_time", "encoded", None, "bytes_out")),
+    ("invalid",     (None, "invalid", None, None)),
+    ("skipped",     (None, "skipped", None, None)),
+    ("specializer_hits", (None, "specializer_hits", None, None)),
+    ("specializer_misses", (None, "specializer_misses", None, None)),
+    ("fieldname_cache_hits", (None, "fieldname_cache_hits", None, None)),
+    ("fieldname_cache_misses", (None, "fieldname_cache_misses", None, None)),
+]
+
+
+class CommandMetrics(object):
+    """ Accumulate counters for a search command, per chunk and in total. """
+
+    def __init__(self, name):
+        self.name = name
+        self.chunks = 0
+        self.chunk = Counter()
+        self.total = Counter()
+
+    def end_chunk(self):
+        """ Fold the current chunk into the totals, start a new chunk, and return the counters of
+        the chunk that just ended.
+        """
+        chunk = self.chunk
+        if chunk:
+            self.total.update(chunk)
+            self.chunks += 1
+            self.chunk = Counter()
+        return chunk
+
+    def search_metrics(self, counters, prefix=""):
+        """ Generate (name, value) pairs suitable for SearchCommand.write_metric() """
+        for (metric, fields) in SEARCH_METRICS:
+            value = tuple(None if f is None else counters[f] for f in fields)
+            if any(value):
+                yield "{}.{}{}".format(self.name, prefix, metric), value
+
+    def summary(self, counters=None):
+        """ Return a single line of key=value pairs, suitable for search.log """
+        if counters is None:
+            counters = self.total
+        items = ["chunks={}".format(self.chunks)]
+        for (counter, value) in sorted(counters.items()):
+            if counter.endswith("_time"):
+                items.append("{}={:.6f}".format(counter, value))
+            else:
+                items.append("{}={}".format(counter, value))
+            if counter.endswith("_hits"):
+                cache = counter[:-len("_hits")]
+                lookups = value + counters[cache + "_misses"]
+                if lookups:
+                    items.append("{}_hit_rate={:.3f}".format(cache, value / lookups))
+        return "{} metrics: {}".format(self.name, " ".join(items))
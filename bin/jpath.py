@@ -1,9 +1,13 @@
 import json
 import re
 import sys
+from collections import Counter
+from functools import partial
 
 import splunk.Intersplunk as si
 
+from command_metrics import CommandMetrics, timer
+
 ERROR_FIELD = "_jmespath_error"
 
 import jmespath
@@ -11,6 +15,9 @@ from six import string_types, text_type
 from jmespath import functions
 from jmespath.exceptions import ParseError, JMESPathError, UnknownFunctionError
 
+from jpath_prefilter import required_literals
+from jpath_specialize import Specializer
+
 
 # Custom functions for the JMSEPath language to make some typical splunk use cases easier to manage
 class JmesPathSplunkExtraFunctions(functions.Functions):
@@ -96,49 +103,72 @@ class JmesPathSplunkExtraFunctions(functions.Functions):
 jp_options = jmespath.Options(custom_functions=JmesPathSplunkExtraFunctions())
 
 
+# Shared encoder; same output as json.dumps() without re-checking keyword arguments on every call
+encode_json = json.JSONEncoder().encode
+
+_fieldname_cache = {}
+_FIELDNAME_CACHE_SIZE = 4096
+_fieldname_invalid_chars = re.compile(r'[^A-Za-z0-9_.{}\[\]]')
+# Lookups in _fieldname_cache, reported with the command's metrics
+fieldname_cache_stats = Counter()
+
+
 def sanitize_fieldname(field):
-    # XXX: Add caching, if needed
-    clean = re.sub(r'[^A-Za-z0-9_.{}\[\]]', "_", field)
+    try:
+        clean = _fieldname_cache[field]
+        fieldname_cache_stats["hits"] += 1
+        return clean
+    except KeyError:
+        fieldname_cache_stats["misses"] += 1
+    clean = _fieldname_invalid_chars.sub("_", field)
     # Remove leading/trailing underscores
     # It would be nice to preserve explicit underscores but don't want to complicate the code for
     # a not-yet-existing corner case.  Generally it's better to avoid hidden fields.
     clean = clean.strip("_")
+    # Keys are nearly always repeated from one event to the next; keep the cache bounded in case
+    # they are not (e.g., keys containing ids or timestamps)
+    if len(_fieldname_cache) >= _FIELDNAME_CACHE_SIZE:
+        _fieldname_cache.clear()
+    _fieldname_cache[field] = clean
     return clean
 
 
-def flatten(container):
-    if isinstance(container, dict):
-        yield json.dumps(container)
-    elif isinstance(container, (list,tuple)):
-        for i in container:
-            if isinstance(i, (list,tuple,dict)):
-                yield json.dumps(i)
-            else:
-                yield text_type(i)
-    else:
-        yield text_type(container)
+def to_text(value):
+    if isinstance(value, (list, tuple, dict)):
+        return encode_json(value)
+    return text_type(value)
 
 
 def output_to_field(values, output, record):
-    content = list(flatten(values))
-    if not content:
-        content = None
-        record[output] = None
-    elif len(content) == 1:
-        # Avoid the overhead of MV field encoding
-        content = content[0]
-    record[output] = content
+    """ Write 'values' to the 'output' field of 'record' and return the characters written """
+    if isinstance(values, dict):
+        value = record[output] = encode_json(values)
+    elif isinstance(values, (list, tuple)):
+        if not values:
+            record[output] = None
+            return 0
+        elif len(values) == 1:
+            # Avoid the overhead of MV field encoding
+            value = record[output] = to_text(values[0])
+        else:
+            value = record[output] = [to_text(value) for value in values]
+            return sum(len(v) for v in value)
+    else:
+        value = record[output] = text_type(values)
+    return len(value)
 
 
 def output_to_wildcard(values, output, record):
-    output_template = output.replace("*", "{}", 1)
+    """ Write 'values' to fields named by the 'output' wildcard and return the characters written """
+    prefix, suffix = output.split("*", 1)
     if values is None:
         # Don't bother to make any fields
-        return
+        return 0
 
+    size = 0
     if isinstance(values, dict):
         for (key, value) in values.items():
-            final_field = output_template.format(sanitize_fieldname(key))
+            final_field = prefix + sanitize_fieldname(key) + suffix
             if isinstance(value, (list, tuple)):
                 if not value:
                     value = None
@@ -146,17 +176,116 @@ def output_to_wildcard(values, output, record):
                     # Unroll, to better match Splunk's default handling of mvfields
                     value = value[0]
                 else:
-                    value = json.dumps(value)
+                    value = encode_json(value)
                 record[final_field] = value
             elif isinstance(value, dict):
-                record[final_field] = json.dumps(value)
+                value = record[final_field] = encode_json(value)
             else:
                 record[final_field] = value
+            if value is not None:
+                size += len(value) if isinstance(value, string_types) else len(text_type(value))
     else:
         # Fallback to using a silly name since there's no hash key to work with.
         # (Maybe users didn't mean to use '*' in output, or possibly a record/data specific issue
-        final_field = output_template.format("anonymous")
-        record[final_field] = json.dumps(values)
+        final_field = prefix + "anonymous" + suffix
+        value = record[final_field] = encode_json(values)
+        size += len(value)
+    return size
+
+
+def is_true(value):
+    """ Interpret a Splunk style boolean option value (1/0, t/f, true/false, y/n, yes/no) """
+    return text_type(value).lower() in ("1", "t", "true", "y", "yes")
+
+
+# Returned by JsonInput.loads() for input that the expression cannot match:  searching it would
+# produce null (NO_MATCH) or an empty list (EMPTY_MATCH)
+NO_MATCH = object()
+EMPTY_MATCH = object()
+
+
+class JsonInput(object):
+    """ Decode JSON input values while cheaply rejecting values that can't possibly be JSON.
+
+    Mixed sourcetypes are mostly non-JSON (syslog, etc.), and raising/catching a ValueError per event
+    is expensive.  Therefore values are checked before the decoder is invoked:  the first
+    non-whitespace character must be one of '{', '[', or '"' and, optionally, the value must not be
+    larger than 'max_size' characters.  In 'embedded' mode, JSON is located after a text prefix
+    (for example a syslog header) starting at the first '{'; anything after the JSON is ignored.
+
+    Values missing any of the 'required' substrings (see jpath_prefilter.required_literals()) are
+    not decoded or searched at all, since the expression can only produce null for them:  NO_MATCH
+    is returned.  Likewise EMPTY_MATCH is returned for values missing any of the 'nonempty'
+    substrings, for which the expression produces null or an empty list.  With 'validate', values
+    are decoded before they are checked, so that invalid JSON is reported as invalid rather than as
+    a miss.
+
+    Counts of skipped values are kept in 'skipped', keyed by reason.
+    """
+    _json_start = re.compile(r'[ \t\r\n]*[{\["]').match
+
+    def __init__(self, max_size=None, embedded=False, required=(), nonempty=(), validate=False):
+        self.max_size = max_size
+        self.embedded = embedded
+        self.required = tuple(required)
+        self.nonempty = tuple(literal for literal in nonempty if literal not in self.required)
+        self.validate = validate
+        self.skipped = Counter()
+        self._decoder = json.JSONDecoder()
+
+    def _match(self, text):
+        """ Return NO_MATCH or EMPTY_MATCH if a required literal is missing from 'text' """
+        for (literals, outcome) in ((self.required, NO_MATCH), (self.nonempty, EMPTY_MATCH)):
+            for literal in literals:
+                if literal not in text:
+                    # Escaped characters (\\uXXXX) could spell out the literal, so decode to be sure
+                    if "\\u" in text:
+                        return None
+                    self.skipped["nomatch"] += 1
+                    return outcome
+        return None
+
+    def loads(self, text):
+        """ Return the decoded object, or None if 'text' was skipped or isn't valid JSON.
+        NO_MATCH or EMPTY_MATCH is returned when a required literal is missing.
+
+        Note that None is never a valid result, as 'null' is always rejected by the pre-check.
+        """
+        if self.max_size and len(text) > self.max_size:
+            self.skipped["oversize"] += 1
+            return None
+        if self.embedded:
+            start = text.find("{")
+            if start < 0:
+                self.skipped["nonjson"] += 1
+                return None
+        elif self._json_start(text) is None:
+            self.skipped["nonjson"] += 1
+            return None
+        check = self.required or self.nonempty
+        if check and not self.validate:
+            match = self._match(text)
+            if match is not None:
+                return match
+        try:
+            if self.embedded:
+                value = self._decoder.raw_decode(text, start)[0]
+            else:
+                value = self._decoder.decode(text)
+        except ValueError:
+            self.skipped["invalid"] += 1
+            return None
+        if check and self.validate:
+            match = self._match(text)
+            if match is not None:
+                return match
+        return value
+
+    def report(self, stream=sys.stderr):
+        """ Write skip counters to 'stream' (stderr is captured in search.log) """
+        if self.skipped:
+            stream.write("jmespath skipped input values: {}\n".format(
+                " ".join("{}={}".format(k, v) for (k, v) in sorted(self.skipped.items()))))
 
 
 def legacy_args_fixer(options):
@@ -179,6 +308,12 @@ def jpath():
         defaultval = options.get('default', None)
         fn_input = options.get('input', options.get('field', '_raw'))
         fn_output = options.get('output', 'jpath')
+        try:
+            max_size = int(options.get('maxsize', 0))
+            learn_count = int(options.get('specialize', 100))
+        except ValueError:
+            si.generateErrorResults("Invalid value for maxsize or specialize.  Must be an integer.")
+            sys.exit(0)
         if len(keywords) != 1:
             si.generateErrorResults('Requires exactly one path argument.')
             sys.exit(0)
@@ -200,7 +335,27 @@ def jpath():
             si.generateErrorResults("Invalid JMESPath expression '{}'. {}".format(path, e))
             sys.exit(0)
 
+        # Without a default, an event that can't match is written out as if it had been searched,
+        # whether or not it is valid JSON, so it needn't be decoded.  An event that a filter can't
+        # match is written out as an empty field (as an empty list is), and only then.
+        nonempty = defaultval is None and apply_output is output_to_field
+        json_input = JsonInput(max_size=max_size, embedded=is_true(options.get('embedded', False)),
+                               required=required_literals(jp.parsed),
+                               nonempty=required_literals(jp.parsed, empty=True) if nonempty else (),
+                               validate=defaultval is not None)
+        if learn_count > 0:
+            # Learn the shape of the first few events, then switch to a specialized evaluator
+            specializer = Specializer(jp, options=jp_options, learn_count=learn_count)
+            search = specializer.search
+        else:
+            specializer = None
+            search = partial(jp.search, options=jp_options)
+
+        metrics = CommandMetrics("jmespath")
+        counters = metrics.chunk
+
         results, dummyresults, settings = si.getOrganizedResults()
+        counters["records"] += len(results)
         # for each results
         for result in results:
             # get field value
@@ -210,14 +365,30 @@ def jpath():
                 if isinstance(ojson, (list, tuple)):
                     # XXX: Add proper support for multivalue input fields.  Just use first value for now
                     ojson = ojson[0]
-                try:
-                    json_obj = json.loads(ojson)
-                except ValueError:
+                start = timer()
+                json_obj = json_input.loads(ojson)
+                counters["decode_time"] += timer() - start
+                counters["decoded"] += 1
+                counters["bytes_in"] += len(ojson)
+                if json_obj is None:
                     # Invalid JSON.  Move on, nothing to see here.
                     continue
                 try:
-                    values = jp.search(json_obj, options=jp_options)
-                    apply_output(values, fn_output, result)
+                    start = timer()
+                    if json_obj is NO_MATCH:
+                        # Same outcome as searching the document:  A required key or value is missing
+                        values = None
+                    elif json_obj is EMPTY_MATCH:
+                        # Nothing that a projection collects can be in the document
+                        values = []
+                    else:
+                        values = search(json_obj)
+                        counters["evaluated"] += 1
+                    counters["eval_time"] += timer() - start
+                    start = timer()
+                    counters["bytes_out"] += apply_output(values, fn_output, result)
+                    counters["encode_time"] += timer() - start
+                    counters["encoded"] += 1
                     result[ERROR_FIELD] = None
                     added = True
                 except UnknownFunctionError as e:
@@ -235,6 +406,19 @@ def jpath():
                 result[fn_output] = defaultval
 
         si.outputResults(results)
+
+        # Intersplunk has no job inspector support, so metrics only go to stderr (search.log)
+        skipped = json_input.skipped
+        counters["invalid"] += skipped["invalid"]
+        counters["skipped"] += skipped["nonjson"] + skipped["oversize"] + skipped["nomatch"]
+        if specializer is not None:
+            counters["specializer_hits"] += specializer.hits
+            counters["specializer_misses"] += specializer.misses
+        counters["fieldname_cache_hits"] += fieldname_cache_stats["hits"]
+        counters["fieldname_cache_misses"] += fieldname_cache_stats["misses"]
+        metrics.end_chunk()
+        json_input.report()
+        sys.stderr.write(metrics.summary() + "\n")
     except Exception as e:
         import traceback
 
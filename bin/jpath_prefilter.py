@@ -0,0 +1,229 @@
+""" Find literals that a JSON document's text must contain for a JMESPath expression to match it.
+
+The 'jmespath' command checks these with a substring test before decoding an event:  when one is
+missing, the outcome of the search is known without decoding the document.
+
+The analysis walks the parsed expression (ParsedResult.parsed).  Literals are key names and string
+literals from '==' comparisons, quoted as they appear in JSON text.  It is conservative:  a literal
+is only reported when its absence guarantees the outcome and guarantees that evaluation can't raise
+an error.  The guarantee does not hold for documents containing \\uXXXX escapes, since those can
+spell out any character.
+"""
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import re
+from collections import namedtuple
+
+from six import string_types
+
+# Outcomes tracked for each literal.  NULL means that the expression is known to produce None,
+# EMPTY that it is known to produce either None or an empty list.
+NULL = "null"
+EMPTY = "empty"
+
+_EQUALITY_OPS = ("eq", "ne")
+
+# Characters that JSON text may represent in more than one way (besides \uXXXX escapes), so a
+# literal containing them can't be searched for.
+_unsafe_chars = re.compile("[\x00-\x1f\"\\\\/  ]")
+
+
+def required_literals(parsed, empty=False):
+    """ Return the substrings of which any one missing from a document's text guarantees that
+    searching the document produces None.  With 'empty', also those which guarantee that it
+    produces either None or an empty list (e.g., the value compared in a filter projection).
+    """
+    outcomes = (NULL, EMPTY) if empty else (NULL,)
+    return frozenset(literal for (literal, outcome) in _Analysis().visit(parsed).literals.items()
+                     if outcome in outcomes)
+
+
+def _json_literal(value):
+    if not isinstance(value, string_types) or not value or _unsafe_chars.search(value):
+        return None
+    return '"{}"'.format(value)
+
+
+class _Requirements(namedtuple("_Requirements", ["literals", "document", "safe", "on_null", "on_empty"])):
+    """ Analysis of a single node.
+
+    * literals - Maps a substring to the outcome (NULL or EMPTY) that is guaranteed, without
+      raising, when the substring is absent from the document text.
+    * document - Whether the node only produces values taken from the document itself (as opposed
+      to literals or function results).
+    * safe - Whether evaluation of the node can never raise.
+    * on_null, on_empty - Outcome when the node is evaluated against a NULL or EMPTY value, or None
+      if not known.
+    """
+
+
+def _map_outcome(outcome, requirements):
+    if outcome == NULL:
+        return requirements.on_null
+    elif outcome == EMPTY:
+        return requirements.on_empty
+    return None
+
+
+def _merge(literals, literal, outcome):
+    # NULL is the stronger guarantee, so it wins
+    if literals.get(literal) != NULL:
+        literals[literal] = outcome
+
+
+class _Analysis(object):
+
+    def visit(self, node):
+        return getattr(self, "visit_" + node["type"], self.default_visit)(node)
+
+    def default_visit(self, node):
+        safe = all(self.visit(child).safe for child in node["children"])
+        return _Requirements({}, False, safe, None, None)
+
+    def visit_field(self, node):
+        literal = _json_literal(node["value"])
+        return _Requirements({literal: NULL} if literal else {}, True, True, NULL, NULL)
+
+    def visit_current(self, node):
+        return _Requirements({}, True, True, NULL, EMPTY)
+
+    visit_identity = visit_current
+
+    def visit_index(self, node):
+        return _Requirements({}, True, True, NULL, NULL)
+
+    def visit_slice(self, node):
+        # A step of 0 raises
+        return _Requirements({}, True, node["children"][2] != 0, NULL, EMPTY)
+
+    def visit_literal(self, node):
+        return _Requirements({}, False, True, None, None)
+
+    def visit_function_expression(self, node):
+        # Functions validate their argument types, so may raise
+        return _Requirements({}, False, False, None, None)
+
+    def visit_comparator(self, node):
+        left = self.visit(node["children"][0])
+        right = self.visit(node["children"][1])
+        # Ordering comparisons raise TypeError for a string and a number
+        safe = node["value"] in _EQUALITY_OPS and left.safe and right.safe
+        return _Requirements({}, False, safe, None, None)
+
+    def visit_subexpression(self, node):
+        literals = {}
+        document = True
+        safe = True
+        on_null, on_empty = NULL, EMPTY
+        for child in node["children"]:
+            current = self.visit(child)
+            mapped = {}
+            for (literal, outcome) in literals.items():
+                outcome = _map_outcome(outcome, current)
+                if outcome is not None:
+                    mapped[literal] = outcome
+            if document and safe:
+                for (literal, outcome) in current.literals.items():
+                    _merge(mapped, literal, outcome)
+            literals = mapped
+            document = document and current.document
+            safe = safe and current.safe
+            on_null = _map_outcome(on_null, current)
+            on_empty = _map_outcome(on_empty, current)
+        return _Requirements(literals, document, safe, on_null, on_empty)
+
+    visit_index_expression = visit_subexpression
+    visit_pipe = visit_subexpression
+
+    def visit_flatten(self, node):
+        return self.visit(node["children"][0])
+
+    def visit_projection(self, node):
+        left = self.visit(node["children"][0])
+        right = self.visit(node["children"][1])
+        literals = dict(left.literals)
+        if left.document and left.safe:
+            self._add_element_literals(literals, right)
+        return _Requirements(literals, left.document and right.document, left.safe and right.safe,
+                             left.on_null, left.on_empty)
+
+    def visit_filter_projection(self, node):
+        left = self.visit(node["children"][0])
+        right = self.visit(node["children"][1])
+        condition = self.visit(node["children"][2])
+        literals = dict(left.literals)
+        if left.document and left.safe:
+            # A condition that is always false leaves nothing collected:  the projection must be
+            # non-empty for a match, so the condition's literals are kept
+            for literal in self._truth_literals(node["children"][2]):
+                _merge(literals, literal, EMPTY)
+            if condition.safe:
+                self._add_element_literals(literals, right)
+        return _Requirements(literals, left.document and right.document,
+                             left.safe and right.safe and condition.safe, left.on_null, left.on_empty)
+
+    def visit_value_projection(self, node):
+        left = self.visit(node["children"][0])
+        right = self.visit(node["children"][1])
+        # Neither None nor a list has values(), so both produce None
+        literals = dict((literal, NULL) for literal in left.literals)
+        if left.document and left.safe:
+            self._add_element_literals(literals, right)
+        on_null = NULL if left.on_null is not None else None
+        on_empty = NULL if left.on_empty is not None else None
+        return _Requirements(literals, left.document and right.document, left.safe and right.safe,
+                             on_null, on_empty)
+
+    def visit_multi_select_dict(self, node):
+        safe = all(self.visit(child).safe for child in node["children"])
+        return _Requirements({}, False, safe, NULL, None)
+
+    visit_multi_select_list = visit_multi_select_dict
+
+    def _add_element_literals(self, literals, right):
+        # If every element evaluates to None, the projection collects nothing and produces []
+        for (literal, outcome) in right.literals.items():
+            if outcome == NULL:
+                _merge(literals, literal, EMPTY)
+
+    def _truth_literals(self, node):
+        # Literals whose absence guarantees that a condition is false
+        node_type = node["type"]
+        if node_type == "and_expression":
+            left, right = node["children"]
+            literals = self._truth_literals(left)
+            if self.visit(left).safe:
+                literals |= self._truth_literals(right)
+            return literals
+        elif node_type == "or_expression":
+            left, right = node["children"]
+            return self._truth_literals(left) & self._truth_literals(right)
+        elif node_type == "not_expression":
+            return set()
+        elif node_type == "comparator":
+            return self._comparator_truth_literals(node)
+        # None and [] are both false
+        return set(self.visit(node).literals)
+
+    def _comparator_truth_literals(self, node):
+        literals = set()
+        first, second = node["children"]
+        if node["value"] == "eq":
+            for (path, other) in ((first, second), (second, first)):
+                if other["type"] != "literal":
+                    continue
+                literal = _json_literal(other["value"])
+                requirements = self.visit(path)
+                if literal and requirements.document and requirements.safe:
+                    # The value must appear in the document to be equal
+                    literals.add(literal)
+                # Neither None nor [] equals a string literal
+                if literal:
+                    literals.update(requirements.literals)
+        elif node["value"] not in _EQUALITY_OPS:
+            # Ordering comparisons produce None when either side is None
+            for (path, other) in ((first, second), (second, first)):
+                if self.visit(other).safe:
+                    literals.update(self.visit(path).literals)
+        return literals
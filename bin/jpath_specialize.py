@@ -0,0 +1,396 @@
+""" Type specialized evaluation of parsed JMESPath expressions.
+
+Documents searched with the same expression, such as events from a
+single source, nearly always have the same shape.  A Specializer
+evaluates the first few documents with a TreeInterpreter while recording
+the types of the values seen at each node of the AST.  It then compiles
+the AST into a tree of closures that skip the generic checks made
+redundant by the learned types, such as function argument validation.
+
+Any value that doesn't match the learned types is caught by a guard (or
+raises an error in the specialized code) and the document is searched
+again with the TreeInterpreter, so results are always the same as those
+of ParsedResult.search().
+
+The closures mirror jmespath.visitor.TreeInterpreter of the vendored
+jmespath (see requirements.txt), including its private helpers, so they
+must be checked against it when jmespath is upgraded:
+tests/test_jpath_specialize.py compares both on fuzzed expressions.
+"""
+from jmespath.visitor import (TreeInterpreter, Options, _Expression,
+                              _is_comparable)
+
+
+class GuardMiss(Exception):
+    """A value doesn't match the types the code was specialized for."""
+
+
+class TypeRecorder(TreeInterpreter):
+    """TreeInterpreter that records value types seen at each node.
+
+    Types are keyed by id() of the AST node.  ``input_types`` are the
+    types of the values a node is evaluated against and ``result_types``
+    the types of the values it produced.  ``argument_types`` holds the
+    types of each argument of function calls that passed the function's
+    signature validation.  Nothing is recorded for nodes that raise an
+    error.
+
+    """
+    def __init__(self, options=None):
+        super(TypeRecorder, self).__init__(options)
+        self.input_types = {}
+        self.result_types = {}
+        self.argument_types = {}
+
+    def visit(self, node, value):
+        result = super(TypeRecorder, self).visit(node, value)
+        key = id(node)
+        self.input_types.setdefault(key, set()).add(type(value))
+        self.result_types.setdefault(key, set()).add(type(result))
+        return result
+
+    def visit_function_expression(self, node, value):
+        resolved_args = []
+        for child in node['children']:
+            current = self.visit(child, value)
+            resolved_args.append(current)
+        result = self._functions.call_function(node['value'], resolved_args)
+        argument_types = self.argument_types.setdefault(
+            id(node), [set() for arg in resolved_args])
+        for types, arg in zip(argument_types, resolved_args):
+            types.add(type(arg))
+        return result
+
+
+def _is_false(value):
+    return (value == '' or value == [] or value == {} or value is None or
+            value is False)
+
+
+class Specializer(object):
+    """Search documents with an evaluator specialized for their shape.
+
+    The first ``learn_count`` documents are searched with a TypeRecorder.
+    Afterwards a specialized evaluator is used.  If more than
+    ``learn_count`` documents miss a guard, the data is not as uniform as
+    expected and all further documents are searched generically.
+
+    """
+    def __init__(self, parsed_result, options=None, learn_count=100):
+        if options is None:
+            options = Options()
+        self.parsed = parsed_result.parsed
+        self.learn_count = learn_count
+        self.learned = 0
+        self.hits = 0
+        self.misses = 0
+        self._interpreter = TreeInterpreter(options)
+        self._functions = self._interpreter._functions
+        self._recorder = TypeRecorder(options)
+        self._specialized = None
+
+    @property
+    def active(self):
+        return self._specialized is not None
+
+    def search(self, value):
+        specialized = self._specialized
+        if specialized is not None:
+            try:
+                result = specialized(value)
+            except Exception:
+                # A guard miss, or an unexpected type raised an error in
+                # code that relied on the learned types.
+                self.misses += 1
+                if self.misses > self.learn_count:
+                    self._specialized = None
+            else:
+                self.hits += 1
+                return result
+            return self._interpreter.visit(self.parsed, value)
+        if self._recorder is None:
+            return self._interpreter.visit(self.parsed, value)
+        result = self._recorder.visit(self.parsed, value)
+        self.learned += 1
+        if self.learned >= self.learn_count:
+            self._specialized = self._compile(self.parsed)
+            self._recorder = None
+        return result
+
+    def _compile(self, node):
+        if id(node) not in self._recorder.result_types:
+            # Never reached while learning; nothing to specialize on.
+            return self._generic(node)
+        method = getattr(self, '_compile_%s' % node['type'], self._generic)
+        return method(node)
+
+    def _generic(self, node):
+        visit = self._interpreter.visit
+
+        def generic(value):
+            return visit(node, value)
+        return generic
+
+    def _input_types(self, node):
+        return self._recorder.input_types.get(id(node), set())
+
+    def _result_types(self, node):
+        return self._recorder.result_types.get(id(node), set())
+
+    def _compile_subexpression(self, node):
+        children = [self._compile(child) for child in node['children']]
+        if len(children) == 2:
+            first, second = children
+
+            def chain2(value):
+                return second(first(value))
+            return chain2
+
+        def chain(value):
+            for child in children:
+                value = child(value)
+            return value
+        return chain
+
+    _compile_index_expression = _compile_subexpression
+    _compile_pipe = _compile_subexpression
+
+    def _compile_field(self, node):
+        key = node['value']
+        if self._input_types(node) == set([dict]):
+            # Any other type raises AttributeError, which falls back to
+            # the generic evaluator.
+            def dict_field(value):
+                return value.get(key)
+            return dict_field
+
+        def field(value):
+            try:
+                return value.get(key)
+            except AttributeError:
+                return None
+        return field
+
+    def _compile_current(self, node):
+        def current(value):
+            return value
+        return current
+
+    _compile_identity = _compile_current
+
+    def _compile_literal(self, node):
+        literal_value = node['value']
+
+        def literal(value):
+            return literal_value
+        return literal
+
+    def _compile_expref(self, node):
+        expression = _Expression(node['children'][0], self._interpreter)
+
+        def expref(value):
+            return expression
+        return expref
+
+    def _compile_comparator(self, node):
+        comparator_func = TreeInterpreter.COMPARATOR_FUNC[node['value']]
+        left = self._compile(node['children'][0])
+        right = self._compile(node['children'][1])
+        if node['value'] in TreeInterpreter._EQUALITY_OPS:
+            def equality(value):
+                return comparator_func(left(value), right(value))
+            return equality
+
+        def ordering(value):
+            left_value = left(value)
+            right_value = right(value)
+            if not (_is_comparable(left_value) and
+                    _is_comparable(right_value)):
+                return None
+            return comparator_func(left_value, right_value)
+        return ordering
+
+    def _compile_function_expression(self, node):
+        name = node['value']
+        args = [self._compile(child) for child in node['children']]
+        functions = self._functions
+        spec = functions.FUNCTION_TABLE.get(name)
+        arg_types = self._recorder.argument_types.get(id(node))
+        if spec is None or arg_types is None or any(
+                '-' in allowed for sig in spec['signature']
+                for allowed in sig['types']):
+            # Unknown function, never called successfully while learning,
+            # or array element types need validating.
+            def call(value):
+                return functions.call_function(
+                    name, [arg(value) for arg in args])
+            return call
+
+        # Argument types seen while learning passed the signature's type
+        # checks, so only those types need guarding.
+        function = spec['function']
+        guards = [(arg, frozenset(types))
+                  for arg, types in zip(args, arg_types)]
+
+        def specialized_call(value):
+            resolved_args = []
+            for arg, allowed in guards:
+                current = arg(value)
+                if type(current) not in allowed:
+                    raise GuardMiss(name)
+                resolved_args.append(current)
+            return function(functions, *resolved_args)
+        return specialized_call
+
+    def _compile_filter_projection(self, node):
+        left_node, right_node, condition_node = node['children']
+        left = self._compile(left_node)
+        right = self._compile(right_node)
+        condition = self._compile(condition_node)
+
+        def filter_projection(value):
+            base = left(value)
+            if type(base) is not list and not isinstance(base, list):
+                return None
+            collected = []
+            for element in base:
+                if not _is_false(condition(element)):
+                    current = right(element)
+                    if current is not None:
+                        collected.append(current)
+            return collected
+        return filter_projection
+
+    def _compile_projection(self, node):
+        left_node, right_node = node['children']
+        left = self._compile(left_node)
+        right = self._compile(right_node)
+
+        def projection(value):
+            base = left(value)
+            if type(base) is not list and not isinstance(base, list):
+                return None
+            collected = []
+            for element in base:
+                current = right(element)
+                if current is not None:
+                    collected.append(current)
+            return collected
+        return projection
+
+    def _compile_flatten(self, node):
+        child = self._compile(node['children'][0])
+
+        def flatten(value):
+            base = child(value)
+            if not isinstance(base, list):
+                return None
+            merged_list = []
+            for element in base:
+                if isinstance(element, list):
+                    merged_list.extend(element)
+                else:
+                    merged_list.append(element)
+            return merged_list
+        return flatten
+
+    def _compile_value_projection(self, node):
+        left_node, right_node = node['children']
+        left = self._compile(left_node)
+        right = self._compile(right_node)
+        dicts_only = self._result_types(left_node) == set([dict])
+
+        def value_projection(value):
+            base = left(value)
+            if dicts_only:
+                # Other types raise AttributeError and fall back.
+                base = base.values()
+            else:
+                try:
+                    base = base.values()
+                except AttributeError:
+                    return None
+            collected = []
+            for element in base:
+                current = right(element)
+                if current is not None:
+                    collected.append(current)
+            return collected
+        return value_projection
+
+    def _compile_index(self, node):
+        index_value = node['value']
+
+        def index(value):
+            if type(value) is not list and not isinstance(value, list):
+                return None
+            try:
+                return value[index_value]
+            except IndexError:
+                return None
+        return index
+
+    def _compile_slice(self, node):
+        s = slice(*node['children'])
+
+        def slice_(value):
+            if not isinstance(value, list):
+                return None
+            return value[s]
+        return slice_
+
+    def _compile_multi_select_dict(self, node):
+        dict_cls = self._interpreter._dict_cls
+        pairs = [(child['value'], self._compile(child['children'][0]))
+                 for child in node['children']]
+
+        def multi_select_dict(value):
+            if value is None:
+                return None
+            collected = dict_cls()
+            for key, child in pairs:
+                collected[key] = child(value)
+            return collected
+        return multi_select_dict
+
+    def _compile_multi_select_list(self, node):
+        children = [self._compile(child) for child in node['children']]
+
+        def multi_select_list(value):
+            if value is None:
+                return None
+            return [child(value) for child in children]
+        return multi_select_list
+
+    def _compile_or_expression(self, node):
+        left = self._compile(node['children'][0])
+        right = self._compile(node['children'][1])
+
+        def or_expression(value):
+            matched = left(value)
+            if _is_false(matched):
+                matched = right(value)
+            return matched
+        return or_expression
+
+    def _compile_and_expression(self, node):
+        left = self._compile(node['children'][0])
+        right = self._compile(node['children'][1])
+
+        def and_expression(value):
+            matched = left(value)
+            if _is_false(matched):
+                return matched
+            return right(value)
+        return and_expression
+
+    def _compile_not_expression(self, node):
+        child = self._compile(node['children'][0])
+
+        def not_expression(value):
+            original_result = child(value)
+            if type(original_result) is int and original_result == 0:
+                # Special case for 0, !0 should be false, not true.
+                return False
+            return not original_result
+        return not_expression
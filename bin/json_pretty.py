@@ -0,0 +1,99 @@
+""" Indented JSON encoding for decoded JSON documents.
+
+``json.dumps(indent=...)`` can't use the C accelerated encoder, and the pure Python encoder passes
+every fragment of output up through a chain of generators, one per level of nesting.  Documents
+produced by ``json.loads`` only contain a handful of types, so they can be encoded by appending
+to a single list instead.  The output is identical to ``json.dumps(obj, indent=indent)``.
+"""
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+from json.encoder import encode_basestring_ascii
+
+from six import integer_types, string_types, text_type
+
+_INFINITY = float("inf")
+
+
+def _encode_float(o):
+    # Same as json.encoder (with allow_nan=True)
+    if o != o:
+        return "NaN"
+    if o == _INFINITY:
+        return "Infinity"
+    if o == -_INFINITY:
+        return "-Infinity"
+    return float.__repr__(o)
+
+
+class JsonPrettyPrinter(object):
+    """ Encode the output of ``json.loads`` like ``json.dumps(obj, indent=indent, sort_keys=...)``.
+    """
+
+    def __init__(self, indent, sort_keys=False):
+        self.indent = " " * indent
+        self.sort_keys = sort_keys
+        self._newlines = ["\n"]
+
+    def _newline(self, depth):
+        newlines = self._newlines
+        while len(newlines) <= depth:
+            newlines.append("\n" + self.indent * len(newlines))
+        return newlines[depth]
+
+    def encode(self, o):
+        out = []
+        self._encode(o, out.append, 0)
+        return "".join(out)
+
+    __call__ = encode
+
+    def _encode(self, o, append, depth):
+        t = type(o)
+        if t is text_type:
+            append(encode_basestring_ascii(o))
+        elif t is dict or isinstance(o, dict):
+            if not o:
+                append("{}")
+                return
+            newline = self._newline(depth + 1)
+            separator = "{" + newline
+            items = sorted(o.items()) if self.sort_keys else o.items()
+            for (key, value) in items:
+                append(separator)
+                separator = "," + newline
+                append(encode_basestring_ascii(key))
+                append(": ")
+                if type(value) is text_type:
+                    append(encode_basestring_ascii(value))
+                else:
+                    self._encode(value, append, depth + 1)
+            append(self._newline(depth) + "}")
+        elif t is list or isinstance(o, list):
+            if not o:
+                append("[]")
+                return
+            newline = self._newline(depth + 1)
+            separator = "[" + newline
+            for value in o:
+                append(separator)
+                separator = "," + newline
+                if type(value) is text_type:
+                    append(encode_basestring_ascii(value))
+                else:
+                    self._encode(value, append, depth + 1)
+            append(self._newline(depth) + "]")
+        elif o is None:
+            append("null")
+        elif o is True:
+            append("true")
+        elif o is False:
+            append("false")
+        elif isinstance(o, integer_types):
+            append(int.__repr__(o))
+        elif isinstance(o, float):
+            append(_encode_float(o))
+        elif isinstance(o, string_types):
+            append(encode_basestring_ascii(o))
+        else:
+            raise TypeError("Object of type {} is not JSON serializable".format(type(o).__name__))
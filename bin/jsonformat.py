@@ -6,7 +6,7 @@ from __future__ import absolute_import, division, print_function, unicode_litera
 import ast
 import sys
 import json
-from functools import partial
+from hashlib import sha256
 
 if sys.version_info >= (3, 7):
     # Small optimization for Python 3; no need for OrderedDict
@@ -16,6 +16,9 @@ else:
 
 from splunklib.searchcommands import dispatch, StreamingCommand, Configuration, Option, validators
 
+from command_metrics import CommandMetrics, timer
+from json_pretty import JsonPrettyPrinter
+
 
 def from_python(s):
     try:
@@ -34,6 +37,9 @@ class JsonFormatCommand(StreamingCommand):
         jsonformat (indent=<int>)? (order=undefined|preserve|sort) (input_mode=json|python)? (errors=<field>)? (<field> (as <field>)?)*
 
     """
+    # Only get, 'in' and item assignment are used on records, which compact records support
+    compact_records = True
+
     indent = Option(
         doc="How many spaces for each indentation.",
         require=False, default=2, validate=validators.Integer(0,10))
@@ -54,8 +60,45 @@ class JsonFormatCommand(StreamingCommand):
     output_mode = Option(
         doc="Select an alternate output mode.  Supports 'json' (the default) and 'makeresults' "
             "which allows easy creation of run-anywhere sample of a json object.  "
-            "You can paste the output to Splunk Answers when requesting help with JSON processing.",
-        require=False, default="json", validate=validators.Set("json", "makeresults"))
+            "You can paste the output to Splunk Answers when requesting help with JSON processing.  "
+            "'canonical' writes compact JSON with sorted keys, and 'digest' only a SHA-256 hash "
+            "of the canonical form, for comparing or deduplicating documents.  'minify' writes "
+            "compact JSON.  'validate' leaves all fields unchanged and only reports errors.",
+        require=False, default="json",
+        validate=validators.Set("json", "makeresults", "canonical", "digest", "minify", "validate"))
+
+    maxsize = Option(
+        doc="Largest JSON value (in characters) that output_mode=makeresults will convert into a "
+            "sample.  Larger values are replaced by an error message.  Use 0 for no limit.",
+        require=False, default=65536, validate=validators.Integer(0))
+
+    def __init__(self):
+        super(JsonFormatCommand, self).__init__()
+        self.metrics = CommandMetrics("jsonformat")
+
+    def write_metrics(self, counters, prefix=""):
+        # Only SCP v2 (chunked) has a job inspector to report metrics to
+        if self.protocol_version == 2:
+            for (name, value) in self.metrics.search_metrics(counters, prefix):
+                self.write_metric(name, value)
+
+    def flush(self):
+        # Called at the end of each chunk; report this chunk's metrics along with running totals
+        chunk = self.metrics.end_chunk()
+        if chunk:
+            self.write_metrics(chunk)
+            self.write_metrics(self.metrics.total, "total.")
+        super(JsonFormatCommand, self).flush()
+
+    def finish(self):
+        chunk = self.metrics.end_chunk()
+        if chunk:
+            self.write_metrics(chunk)
+            self.write_metrics(self.metrics.total, "total.")
+        if self.metrics.chunks:
+            # stderr ends up in search.log
+            sys.stderr.write(self.metrics.summary() + "\n")
+        super(JsonFormatCommand, self).finish()
 
     @staticmethod
     def handle_field_as(fieldnames):
@@ -75,16 +118,34 @@ class JsonFormatCommand(StreamingCommand):
         return fieldpairs
 
     def stream(self, records):
-        json_loads = json.loads
-        json_dumps = partial(json.dumps, indent=self.indent)
-
-        if self.order == "preserve":
-            json_loads = partial(json.loads, object_pairs_hook=OrderedDict)
-        elif self.order == "sort":
-            json_dumps = partial(json.dumps, indent=self.indent, sort_keys=True)
-
+        # Encoders and decoders are prepared once; json.dumps() and json.loads() build a new one
+        # on each call whenever non-default options are given.
+        sort_keys = self.order == "sort"
         if self.input_mode == "python":
+            # Python literals may have non-string keys, which only json's encoder converts
             json_loads = from_python
+            json_dumps = json.JSONEncoder(indent=self.indent, sort_keys=sort_keys).encode
+        else:
+            if self.order == "preserve" and OrderedDict is not dict:
+                json_loads = json.JSONDecoder(object_pairs_hook=OrderedDict).decode
+            else:
+                json_loads = json.loads
+            # Same output as json.dumps(), without its generator overhead
+            json_dumps = JsonPrettyPrinter(self.indent, sort_keys=sort_keys)
+        json_minify = json.JSONEncoder(separators=(",", ":")).encode
+
+        if self.output_mode in ("canonical", "digest"):
+            # Minimal separators and sorted keys; equal documents always produce the same text
+            json_canonical = json.JSONEncoder(separators=(",", ":"), sort_keys=True).encode
+            if self.output_mode == "canonical":
+                json_dumps = json_canonical
+            else:
+                def json_dumps(data):
+                    # Hashed in one piece:  iterencode() can't use json's C encoder, and the
+                    # canonical text is about the size of the input anyway.
+                    return sha256(json_canonical(data).encode("ascii")).hexdigest()
+        elif self.output_mode == "minify":
+            json_dumps = json.JSONEncoder(separators=(",", ":"), sort_keys=sort_keys).encode
 
         if self.fieldnames:
             fieldpairs = self.handle_field_as(self.fieldnames)
@@ -99,30 +160,56 @@ class JsonFormatCommand(StreamingCommand):
 
         def output_json(json_string):
             # Normal mode.  Just load and dump json
+            start = timer()
             data = json_loads(json_string)
-            return json_dumps(data)
+            decoded = timer()
+            text = json_dumps(data)
+            counters = self.metrics.chunk
+            counters["decode_time"] += decoded - start
+            counters["encode_time"] += timer() - decoded
+            return text
 
         def output_makeresults(json_string):
             # Build a "makeresults" (run-anywhere) output sample
-            quote_chars = ('\\', "\n", "\t", '"')       # Order matters
+            if self.maxsize and len(json_string) > self.maxsize:
+                return "ERROR:  JSON value of {} characters is larger than maxsize={}".format(
+                    len(json_string), self.maxsize)
+            start = timer()
             try:
                 data = json_loads(json_string)
-                json_min = json.dumps(data, indent=None, separators=(",", ":"))
-                for char in quote_chars:
-                    json_min = json_min.replace(char, "\\" + char)
-                return '| makeresults | eval {}="{}"'.format(src_field, json_min)
             except ValueError as e:
                 return "ERROR:  {!r}   {}".format(json_string, e)
+            decoded = timer()
+            # The compact encoder escapes newlines and tabs, so only backslashes and quotes remain
+            # to be escaped for the eval string.  (str.replace is much faster than str.translate.)
+            json_min = json_minify(data).replace("\\", "\\\\").replace('"', '\\"')
+            text = '| makeresults | eval {}="{}"'.format(src_field, json_min)
+            counters = self.metrics.chunk
+            counters["decode_time"] += decoded - start
+            counters["encode_time"] += timer() - decoded
+            return text
+
+        def output_validate(json_string):
+            # Decode only, with the fastest decoder (order doesn't matter).  Nothing is written.
+            start = timer()
+            json_validate(json_string)
+            self.metrics.chunk["decode_time"] += timer() - start
 
-        if self.output_mode == "json":
+        if self.output_mode in ("json", "canonical", "digest", "minify"):
             output = output_json
         elif self.output_mode == "makeresults":
             output = output_makeresults
+        elif self.output_mode == "validate":
+            output = output_validate
+            json_validate = from_python if self.input_mode == "python" else json.loads
+        validate_only = output is output_validate
 
         first_row = True
         linecount_set = False
 
         for record in records:
+            counters = self.metrics.chunk
+            counters["records"] += 1
             errors = []
             for (src_field, dest_field) in fieldpairs:
                 json_string = record.get(src_field, None)
@@ -130,30 +217,38 @@ class JsonFormatCommand(StreamingCommand):
                     # XXX: Add proper support for multivalue input fields.  For now, skip.
                     json_string = None
                 if json_string:
+                    counters["decoded"] += 1
+                    counters["bytes_in"] += len(json_string)
                     try:
                         text = output(json_string)
+                        if validate_only:
+                            continue
+                        counters["encoded"] += 1
+                        counters["bytes_out"] += len(text)
                         record[dest_field] = text
                         # Handle special case for _raw message update
                         if dest_field == "_raw":
                             if "linecount" in record:
-                                record["linecount"] = len(text.splitlines())
+                                # Encoded JSON has no line breaks other than "\n"
+                                record["linecount"] = text.count("\n") + 1
                                 linecount_set = True
                     except ValueError as e:
+                        counters["invalid"] += 1
                         if len(fieldpairs) > 1:
-                            errors.append("Field {} error:  {}".format(src_field, e.message))
+                            errors.append("Field {} error:  {}".format(src_field, e))
                         else:
-                            errors.append(e.message)
+                            errors.append("{}".format(e))
                 else:
-                    if src_field != dest_field:
+                    if src_field != dest_field and not validate_only:
                         record[dest_field] = json_string
-                if self.errors:
-                    record[self.errors] = errors or "none"
+            if self.errors:
+                record[self.errors] = errors or "none"
 
             # Make sure that all of our output fields are present on the first record, since this
             # dictates the possible return fields which cannot be updated later.
             if first_row:
                 first_row = False
-                needed_fields = [ df for (sf, df) in fieldpairs ]
+                needed_fields = [] if validate_only else [ df for (sf, df) in fieldpairs ]
                 if linecount_set:
                     needed_fields.append("linecount")
                 for f in needed_fields:
@@ -0,0 +1,244 @@
+# Copyright 2011-2015 Splunk, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"): you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""The **splunklib.asyncclient** module provides an :mod:`asyncio` interface
+to the search job operations of :class:`splunklib.client.Service`: creating
+jobs, polling their status, fetching their results a page at a time, and
+cancelling them. It requires Python 3.7 or later.
+
+Requests are made by the same binding layer as :mod:`splunklib.client`, on a
+bounded pool of worker threads that share one pool of keep-alive connections.
+At most ``max_concurrency`` requests are in flight at once, however many jobs
+are being watched, and a coroutine waiting for a job to finish holds neither a
+thread nor a connection between polls::
+
+    import asyncio
+    import splunklib.asyncclient as asyncclient
+
+    async def search(service, query):
+        job = await service.create_job(query)
+        await job.wait()
+        return [result async for result in job.results()]
+
+    async def main():
+        async with await asyncclient.connect(host='localhost', port=8089,
+                                             username='admin', password='...') as service:
+            return await asyncio.gather(*[search(service, query) for query in queries])
+"""
+
+from __future__ import absolute_import
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from .client import Job, Service
+from .results import JSONResultsReader, Message
+
+__all__ = [
+    "connect",
+    "AsyncJob",
+    "AsyncService",
+]
+
+DEFAULT_MAX_CONCURRENCY = 8
+DEFAULT_POLL_INTERVAL = 0.5
+DEFAULT_PAGE_SIZE = 10000
+
+
+async def connect(**kwargs):
+    """This coroutine connects and logs in to a Splunk instance, as
+    :func:`splunklib.client.connect` does.
+
+    :param max_concurrency: The number of requests that may be in flight at
+        once (the default is 8).
+    :type max_concurrency: ``integer``
+    :param kwargs: The arguments of :func:`splunklib.client.connect`. Unless
+        ``pool_size`` is given, ``max_concurrency`` connections are kept alive.
+
+    :return: An initialized :class:`AsyncService` connection.
+    """
+    service = AsyncService(**kwargs)
+    await service.login()
+    return service
+
+
+class AsyncService(object):
+    """A :class:`splunklib.client.Service` whose search job operations are
+    coroutines.
+
+    :param service: The service to make requests with (optional). Give it a
+        ``pool_size`` of at least ``max_concurrency``, so that every request in
+        flight can reuse a connection.
+    :type service: :class:`splunklib.client.Service`
+    :param max_concurrency: The number of requests that may be in flight at
+        once (the default is 8).
+    :type max_concurrency: ``integer``
+    :param kwargs: When no ``service`` is given, the arguments of the
+        :class:`splunklib.client.Service` to create. Unless ``pool_size`` is
+        given, ``max_concurrency`` connections are kept alive.
+    """
+    def __init__(self, service=None, max_concurrency=DEFAULT_MAX_CONCURRENCY, **kwargs):
+        if service is None:
+            kwargs.setdefault("pool_size", max_concurrency)
+            service = Service(**kwargs)
+        self.service = service
+        self.max_concurrency = max_concurrency
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Stops the worker threads and closes the idle connections."""
+        self._executor.shutdown(wait=False)
+        self.service.http.close()
+
+    async def call(self, function, *args, **kwargs):
+        """Calls a blocking function on a worker thread, as soon as fewer than
+        ``max_concurrency`` calls are running.
+
+        :return: The function's return value.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(function, *args, **kwargs))
+
+    async def login(self):
+        """Logs in to the Splunk instance. See :meth:`splunklib.binding.Context.login`."""
+        await self.call(self.service.login)
+        return self
+
+    async def create_job(self, query, **kwargs):
+        """Creates a search job. See :meth:`splunklib.client.Jobs.create`.
+
+        :param query: The search query.
+        :type query: ``string``
+        :param kwargs: Additional parameters for the search job.
+
+        :return: The :class:`AsyncJob`.
+        """
+        job = await self.call(self.service.jobs.create, query, **kwargs)
+        return AsyncJob(self, job)
+
+    def job(self, sid):
+        """Returns the search job with the given search ID, without making a
+        round trip to the server.
+
+        :return: The :class:`AsyncJob`.
+        """
+        return AsyncJob(self, Job(self.service, sid))
+
+
+class AsyncJob(object):
+    """A search job whose operations are coroutines. The job is made by
+    :meth:`AsyncService.create_job` or :meth:`AsyncService.job`; the
+    underlying :class:`splunklib.client.Job` is its ``job`` attribute.
+
+    ``content`` is the job's state as of the last :meth:`refresh`, or ``None``
+    until the job is ready.
+    """
+    def __init__(self, service, job):
+        self.service = service
+        self.job = job
+        self.content = None
+
+    @property
+    def sid(self):
+        return self.job.sid
+
+    @property
+    def done(self):
+        """Whether the job was done as of the last :meth:`refresh`."""
+        return self.content is not None and self.content['isDone'] == '1'
+
+    async def refresh(self):
+        """Fetches the state of the job, which is a single round trip.
+
+        :return: The :class:`AsyncJob`.
+        """
+        self.content = await self.service.call(_poll, self.job)
+        return self
+
+    async def is_done(self):
+        """Indicates whether the job finished running. See
+        :meth:`splunklib.client.Job.is_done`.
+
+        :rtype: ``boolean``
+        """
+        await self.refresh()
+        return self.done
+
+    async def wait(self, poll_interval=DEFAULT_POLL_INTERVAL):
+        """Polls the job every ``poll_interval`` seconds until it is done. To
+        give up after a time, wrap it in :func:`asyncio.wait_for`.
+
+        :return: The :class:`AsyncJob`.
+        """
+        while not await self.is_done():
+            await asyncio.sleep(poll_interval)
+        return self
+
+    async def results(self, page_size=DEFAULT_PAGE_SIZE, **query_params):
+        """Yields the results of the finished job, and any messages, as
+        :class:`splunklib.results.JSONResultsReader` does. The results are
+        fetched ``page_size`` at a time with ``count`` and ``offset``, each
+        page being read on a worker thread, until the job's ``resultCount``
+        results have been read. The server may return fewer results than
+        asked for (at most ``maxresultrows``, 50000 by default), so only an
+        empty page ends the results early.
+
+        :param query_params: Additional parameters for
+            :meth:`splunklib.client.Job.results`.
+        """
+        if self.content is None:
+            await self.refresh()
+        total = int(self.content['resultCount']) if self.done else None
+        offset = int(query_params.pop('offset', 0))
+        while total is None or offset < total:
+            page = await self.service.call(_read_page, self.job, offset, page_size, query_params)
+            count = 0
+            for item in page:
+                if not isinstance(item, Message):
+                    count += 1
+                yield item
+            if count == 0:
+                break
+            offset += count
+
+    async def cancel(self):
+        """Stops the job and deletes its results. See
+        :meth:`splunklib.client.Job.cancel`.
+
+        :return: The :class:`AsyncJob`.
+        """
+        await self.service.call(self.job.cancel)
+        return self
+
+
+def _poll(job):
+    # One round trip:  None until the job is ready (Job.is_done would refresh again)
+    if not job.is_ready():
+        return None
+    return job.content
+
+
+def _read_page(job, offset, count, query_params):
+    body = job.results(output_mode='json', offset=offset, count=count, **query_params)
+    try:
+        return list(JSONResultsReader(body))
+    finally:
+        body.close()
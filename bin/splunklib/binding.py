@@ -26,11 +26,15 @@ If you want a friendlier interface to the Splunk REST API, use the
 
 from __future__ import absolute_import
 
+import errno
 import io
 import logging
+import select
 import socket
 import ssl
 import sys
+import threading
+import zlib
 from base64 import b64encode
 from contextlib import contextmanager
 from datetime import datetime
@@ -63,6 +67,7 @@ __all__ = [
 DEFAULT_HOST = "localhost"
 DEFAULT_PORT = "8089"
 DEFAULT_SCHEME = "https"
+DEFAULT_POOL_SIZE = 4
 
 def _log_duration(f):
     @wraps(f)
@@ -455,6 +460,12 @@ class Context(object):
     :param headers: List of extra HTTP headers to send (optional).
     :type headers: ``list`` of 2-tuples.
     :param handler: The HTTP request handler (optional).
+    :param pool_size: With the default handler, keep connections alive and
+        reuse them, keeping up to this many idle connections (optional).
+    :type pool_size: ``integer``
+    :param compress: With the default handler, request compressed (gzip or
+        deflate) responses, which are decompressed as they are read (optional).
+    :type compress: ``Boolean``
     :returns: A ``Context`` instance.
 
     **Example**::
@@ -471,7 +482,8 @@ class Context(object):
     """
     def __init__(self, handler=None, **kwargs):
         self.http = HttpLib(handler, kwargs.get("verify", False), key_file=kwargs.get("key_file"),
-                            cert_file=kwargs.get("cert_file"))  # Default to False for backward compat
+                            cert_file=kwargs.get("cert_file"),  # Default to False for backward compat
+                            pool_size=kwargs.get("pool_size"), compress=kwargs.get("compress", False))
         self.token = kwargs.get("token", _NoAuthenticationToken)
         if self.token is None: # In case someone explicitly passes token=None
             self.token = _NoAuthenticationToken
@@ -1131,14 +1143,28 @@ class HttpLib(object):
     to get a handler function.
 
     If using the default handler, SSL verification can be disabled by passing verify=False.
+    With ``pool_size``, the default handler keeps connections alive and reuses
+    them (see :class:`ConnectionPool`); :meth:`close` closes the idle ones.
+    With ``compress``, it requests compressed responses.
     """
-    def __init__(self, custom_handler=None, verify=False, key_file=None, cert_file=None):
+    def __init__(self, custom_handler=None, verify=False, key_file=None, cert_file=None, pool_size=None,
+                 compress=False):
         if custom_handler is None:
-            self.handler = handler(verify=verify, key_file=key_file, cert_file=cert_file)
+            self.handler = handler(verify=verify, key_file=key_file, cert_file=cert_file, pool_size=pool_size,
+                                   compress=compress)
         else:
             self.handler = custom_handler
         self._cookies = {}
 
+    def close(self):
+        """Closes the idle connections of the default handler's pool, if any.
+
+        Connections are pooled again by later requests.
+        """
+        pool = getattr(self.handler, "pool", None)
+        if pool is not None:
+            pool.clear()
+
     def delete(self, url, headers=None, **kwargs):
         """Sends a DELETE request to a URL.
 
@@ -1275,14 +1301,34 @@ class ResponseReader(io.RawIOBase):
     The ``ResponseReader`` class is intended to be a layer to unify the different
     types of HTTP libraries used with this SDK. This class also provides a
     preview of the stream and a few useful predicates.
+
+    Responses with a ``Content-Encoding`` of ``gzip`` or ``deflate`` (see the
+    ``compress`` option of :func:`handler`) are decompressed as they are read,
+    so the body is still streamed.
     """
     # For testing, you can use a StringIO as the argument to
     # ``ResponseReader`` instead of an ``httplib.HTTPResponse``. It
     # will work equally well.
-    def __init__(self, response, connection=None):
+
+    # Compressed bytes read from the response at a time
+    block_size = 64 * 1024
+
+    def __init__(self, response, connection=None, pool=None):
         self._response = response
         self._connection = connection
+        self._pool = pool
         self._buffer = b''
+        self._decompressor = None
+        getheader = getattr(response, "getheader", None)
+        encoding = getheader("Content-Encoding", "").strip().lower() if getheader else ""
+        if encoding in ("gzip", "x-gzip", "deflate"):
+            # 32 + MAX_WBITS accepts both gzip and zlib headers
+            self._decompressor = zlib.decompressobj(32 + zlib.MAX_WBITS)
+            self._encoding = encoding
+            self._started = False
+            self._head = b''
+            self._pending = b''
+            self._pending_position = 0
 
     def __str__(self):
         return self.read()
@@ -1302,15 +1348,28 @@ class ResponseReader(io.RawIOBase):
         :type size: ``integer``
         """
         c = self.read(size)
-        self._buffer = self._buffer + c
+        self._buffer = c + self._buffer
         return c
 
     def close(self):
-        """Closes this response."""
+        """Closes this response.
+
+        A keep-alive connection from a :class:`ConnectionPool` is returned to
+        the pool if the response was read to the end, and closed otherwise.
+        """
         if self._connection:
-            self._connection.close()
+            if self._pool is not None and self._response.isclosed():
+                self._release()
+            else:
+                self._connection.close()
+                self._connection = None
         self._response.close()
 
+    def _release(self):
+        # The whole response was read, so the connection can carry the next request
+        connection, self._connection = self._connection, None
+        self._pool.put(connection)
+
     def read(self, size = None):
         """Reads a given number of characters from the response.
 
@@ -1320,12 +1379,78 @@ class ResponseReader(io.RawIOBase):
 
         """
         r = self._buffer
+        if size is not None and size <= len(r):
+            # Served from what peek() read ahead
+            self._buffer = r[size:]
+            return r[:size]
         self._buffer = b''
         if size is not None:
             size -= len(r)
-        r = r + self._response.read(size)
+        if self._decompressor is None:
+            r = r + self._response.read(size)
+        elif size is None or size > 0:
+            r = r + self._decompress(size)
+        if self._pool is not None and self._connection is not None and self._response.isclosed():
+            # Callers rarely close responses; hand the connection back as soon as it's free
+            self._release()
         return r
 
+    def _decompress(self, size):
+        # Returns up to size (or all the) decompressed bytes; less than size only at the end.
+        # Data is decompressed a block at a time and kept in _pending, so that small reads
+        # (ResultsReader reads a byte at a time) only copy what they return.
+        pending, position = self._pending, self._pending_position
+        if size is not None and position + size <= len(pending):
+            self._pending_position = position + size
+            return pending[position:position + size]
+        out = []
+        count = 0
+        while size is None or count < size:
+            pending, position = self._pending, self._pending_position
+            if position < len(pending):
+                take = len(pending) - position if size is None else min(size - count, len(pending) - position)
+                out.append(pending[position:position + take])
+                count += take
+                self._pending_position = position + take
+                continue
+            block = self._decompress_block()
+            if not block:
+                break
+            self._pending, self._pending_position = block, 0
+        return out[0] if len(out) == 1 else b"".join(out)
+
+    def _decompress_block(self):
+        # Returns the next block of decompressed data, or b"" at the end of the response
+        decompressor = self._decompressor
+        while True:
+            data = decompressor.unconsumed_tail
+            if not data:
+                if decompressor.eof:
+                    # Reach the end of the response, so that its connection can be reused
+                    self._response.read()
+                    return b""
+                data = self._response.read(self.block_size)
+                if not data:
+                    block = decompressor.flush()
+                    if block or not (self._started or self._head):
+                        return block
+                    # The connection was closed before the end of the compressed stream
+                    raise six.moves.http_client.IncompleteRead(b'')
+            try:
+                block = decompressor.decompress(data, self.block_size)
+            except zlib.error:
+                if self._started or self._encoding != "deflate":
+                    raise
+                # Some servers send raw deflate data, without the zlib header
+                decompressor = self._decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+                block = decompressor.decompress(self._head + data, self.block_size)
+            if block:
+                self._started = True
+                return block
+            if not self._started:
+                # The header may take more than one read to be rejected
+                self._head += data
+
     def readable(self):
         """ Indicates that the response reader is readable."""
         return True
@@ -1344,10 +1469,139 @@ class ResponseReader(io.RawIOBase):
         return bytes_read
 
 
-def handler(key_file=None, cert_file=None, timeout=None, verify=False):
+class _HTTPSConnection(six.moves.http_client.HTTPSConnection):
+    """An ``HTTPSConnection`` that resumes a previous TLS session, when given one.
+
+    Resuming a session skips the key exchange and certificate checks of a
+    full TLS handshake.
+    """
+    tls_session = None
+
+    def connect(self):
+        if self.tls_session is None or not hasattr(ssl.SSLSocket, "session"):
+            return six.moves.http_client.HTTPSConnection.connect(self)
+        # Same as HTTPSConnection.connect, but for the session
+        six.moves.http_client.HTTPConnection.connect(self)
+        server_hostname = self._tunnel_host or self.host
+        self.sock = self._context.wrap_socket(self.sock, server_hostname=server_hostname,
+                                              session=self.tls_session)
+
+
+class ConnectionPool(object):
+    """This class keeps idle keep-alive connections for reuse by later requests.
+
+    Connections are kept per scheme, host, and port, up to ``size`` idle
+    connections for each. Any number of connections can be in use at the same
+    time; those returned when ``size`` connections are already idle are
+    closed. The pool is thread-safe, and each connection is only used by one
+    request at a time.
+
+    The TLS session of the last connection returned for a host is kept as
+    well, so that new connections to that host resume it rather than making
+    a full handshake.
+
+    :param `connect`: A function of ``(scheme, host, port)`` that returns a
+        new ``httplib`` connection.
+    :param `size`: The number of idle connections to keep for each host.
+    :type size: ``integer``
+    """
+    def __init__(self, connect, size=DEFAULT_POOL_SIZE):
+        self.size = size
+        self._connect = connect
+        self._idle = {}
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def get(self, scheme, host, port):
+        """Returns an idle connection to the host, or a new one if there is none.
+
+        Idle connections that the server has closed (or sent unexpected data
+        on) are closed and skipped, as urllib3 does.
+
+        :return: A ``(connection, reused)`` pair; ``reused`` is ``True`` for
+            an idle connection, which the server may still close before it
+            gets the request.
+        """
+        key = (scheme, host, port)
+        dropped = []
+        try:
+            with self._lock:
+                idle = self._idle.get(key)
+                while idle:
+                    connection = idle.pop()
+                    if not _is_dropped(connection):
+                        return connection, True
+                    dropped.append(connection)
+                session = self._sessions.get(key)
+        finally:
+            for connection in dropped:
+                connection.close()
+        return self.connect(scheme, host, port, session), False
+
+    def connect(self, scheme, host, port, session=None):
+        """Returns a new connection to the host, which can be put in the pool."""
+        connection = self._connect(scheme, host, port)
+        connection.pool_key = (scheme, host, port)
+        if session is not None:
+            connection.tls_session = session
+        return connection
+
+    def put(self, connection):
+        """Returns a connection to the pool once its response has been read."""
+        key = connection.pool_key
+        sock = connection.sock
+        if sock is None:
+            # The server asked to close it
+            return
+        session = getattr(sock, "session", None)
+        with self._lock:
+            if session is not None:
+                self._sessions[key] = session
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.size:
+                idle.append(connection)
+                return
+        connection.close()
+
+    def clear(self):
+        """Closes all the idle connections."""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in six.itervalues(idle):
+            for connection in connections:
+                connection.close()
+
+
+def _is_dropped(connection):
+    # An idle connection has nothing to read:  if its socket is readable, the server closed it (or
+    # broke the protocol)
+    sock = connection.sock
+    if sock is None:
+        return True
+    try:
+        if hasattr(select, "poll"):
+            poller = select.poll()
+            poller.register(sock, select.POLLIN)
+            return bool(poller.poll(0))
+        return bool(select.select([sock], [], [], 0)[0])
+    except (ValueError, select.error):
+        return True
+
+
+def handler(key_file=None, cert_file=None, timeout=None, verify=False, pool_size=None, compress=False):
     """This class returns an instance of the default HTTP request handler using
     the values you provide.
 
+    By default, each request is made on a new connection. With ``pool_size``,
+    connections are kept alive and reused through a :class:`ConnectionPool`,
+    which the handler has as its ``pool`` attribute.
+
+    With ``compress``, responses are requested with gzip or deflate encoding,
+    and are decompressed by :class:`ResponseReader` as they are read. Search
+    results typically compress ten times or more, which matters for large
+    downloads over slow links; on a fast network, compression costs more
+    (CPU on both ends) than it saves.
+
     :param `key_file`: A path to a PEM (Privacy Enhanced Mail) formatted file containing your private key (optional).
     :type key_file: ``string``
     :param `cert_file`: A path to a PEM (Privacy Enhanced Mail) formatted file containing a certificate chain file (optional).
@@ -1356,7 +1610,13 @@ def handler(key_file=None, cert_file=None, timeout=None, verify=False):
     :type timeout: ``integer`` or "None"
     :param `verify`: Set to False to disable SSL verification on https connections.
     :type verify: ``Boolean``
+    :param `pool_size`: The number of idle keep-alive connections to keep for each host (optional).
+    :type pool_size: ``integer`` or "None"
+    :param `compress`: Request compressed responses (optional).
+    :type compress: ``Boolean``
     """
+    if pool_size is not None:
+        return _pooled_handler(key_file, cert_file, timeout, verify, pool_size, compress)
 
     def connect(scheme, host, port):
         kwargs = {}
@@ -1382,6 +1642,8 @@ def handler(key_file=None, cert_file=None, timeout=None, verify=False):
             "Accept": "*/*",
             "Connection": "Close",
         } # defaults
+        if compress:
+            head["Accept-Encoding"] = "gzip, deflate"
         for key, value in message["headers"]:
             head[key] = value
         method = message.get("method", "GET")
@@ -1406,3 +1668,101 @@ def handler(key_file=None, cert_file=None, timeout=None, verify=False):
         }
 
     return request
+
+
+# Requests that may be sent again when a reused connection fails
+_IDEMPOTENT_METHODS = ("GET", "HEAD", "DELETE")
+
+# Errors sending a request on a reused connection that the server has closed:  it never got the
+# request, so any request may be sent again
+_UNSENT_ERRNOS = (errno.EPIPE, errno.ECONNRESET)
+
+
+def _pooled_handler(key_file, cert_file, timeout, verify, pool_size, compress):
+    # One TLS context for all connections; sessions can only be resumed within a context
+    if verify:
+        context = ssl.create_default_context()
+    else:
+        context = ssl._create_unverified_context()
+    if key_file is not None or cert_file is not None:
+        context.load_cert_chain(cert_file, key_file)
+
+    def connect(scheme, host, port):
+        kwargs = {}
+        if timeout is not None: kwargs['timeout'] = timeout
+        if scheme == "http":
+            return six.moves.http_client.HTTPConnection(host, port, **kwargs)
+        if scheme == "https":
+            return _HTTPSConnection(host, port, context=context, **kwargs)
+        raise ValueError("unsupported scheme: %s" % scheme)
+
+    pool = ConnectionPool(connect, pool_size)
+
+    def send(connection, method, path, body, head):
+        connection.request(method, path, body, head)
+        return receive(connection)
+
+    def receive(connection):
+        if timeout is not None:
+            connection.sock.settimeout(timeout)
+        return connection.getresponse()
+
+    def request(url, message, **kwargs):
+        scheme, host, port, path = _spliturl(url)
+        body = message.get("body", "")
+        head = {
+            "Content-Length": str(len(body)),
+            "Host": host,
+            "User-Agent": "splunk-sdk-python/1.6.13",
+            "Accept": "*/*",
+            "Connection": "Keep-Alive",
+        } # defaults
+        if compress:
+            head["Accept-Encoding"] = "gzip, deflate"
+        for key, value in message["headers"]:
+            head[key] = value
+        method = message.get("method", "GET")
+
+        connection, reused = pool.get(scheme, host, port)
+        sent = False
+        try:
+            connection.request(method, path, body, head)
+            sent = True
+            response = receive(connection)
+        except socket.timeout:
+            connection.close()
+            raise
+        except (socket.error, six.moves.http_client.BadStatusLine) as e:
+            connection.close()
+            unsent = not sent and getattr(e, "errno", None) in _UNSENT_ERRNOS
+            if not reused or not (unsent or method in _IDEMPOTENT_METHODS):
+                raise
+            # The server most likely closed the idle connection before it got the request; retry
+            # once.  Once sent, a POST may have reached splunkd anyway (creating a job, say), so it
+            # is only sent again if sending it failed.
+            connection = pool.connect(scheme, host, port)
+            try:
+                response = send(connection, method, path, body, head)
+            except:
+                connection.close()
+                raise
+        except:
+            connection.close()
+            raise
+
+        if response.length == 0:
+            # Nothing to read; the connection is free right away
+            response.read()
+        if response.isclosed():
+            pool.put(connection)
+            connection = None
+
+        return {
+            "status": response.status,
+            "reason": response.reason,
+            "headers": response.getheaders(),
+            "body": ResponseReader(response, connection, pool),
+        }
+
+    request.pool = pool
+    return request
@@ -63,6 +63,8 @@ import datetime
 import json
 import logging
 import socket
+import sys
+import threading
 from datetime import datetime, timedelta
 from time import sleep
 
@@ -74,6 +76,7 @@ from .binding import (AuthenticationError, Context, HTTPError, UrlEncoded,
                       _encode, _make_cookie_header, _NoAuthenticationToken,
                       namespace)
 from .data import record
+from .results import JSONResultsReader, ResultsReader
 
 __all__ = [
     "connect",
@@ -318,6 +321,12 @@ def connect(**kwargs):
     :type username: ``string``
     :param `password`: The password for the Splunk account.
     :type password: ``string``
+    :param `pool_size`: Keep connections alive and reuse them, keeping up to
+                        this many idle connections (optional).
+    :type pool_size: ``integer``
+    :param `compress`: Request compressed responses, which pays off for large
+                       results over slow links (optional).
+    :type compress: ``Boolean``
     :return: An initialized :class:`Service` connection.
 
     **Example**::
@@ -384,6 +393,12 @@ class Service(_BaseService):
     :param `password`: The password, which is used to authenticate the Splunk
                        instance.
     :type password: ``string``
+    :param `pool_size`: Keep connections alive and reuse them, keeping up to
+                        this many idle connections (optional).
+    :type pool_size: ``integer``
+    :param `compress`: Request compressed responses, which pays off for large
+                       results over slow links (optional).
+    :type compress: ``Boolean``
     :return: A :class:`Service` instance.
 
     **Example**::
@@ -2775,6 +2790,74 @@ class Job(Entity):
         query_params['segmentation'] = query_params.get('segmentation', 'none')
         return self.get("results", **query_params).body
 
+    def iter_results(self, page_size=50000, max_workers=4, max_buffered_pages=None, **query_params):
+        """Returns an iterator over the results of this finished job, which
+        fetches them a page at a time, several pages at once::
+
+            import splunklib.client as client
+            service = client.connect(..., pool_size=4)
+            job = service.jobs.create("search index=main", exec_mode="blocking")
+            for result in job.iter_results(max_workers=4):
+                if isinstance(result, dict):
+                    print result
+
+        Each page of ``page_size`` results is fetched with :meth:`results`
+        (``count`` and ``offset``) and read with
+        :class:`splunklib.results.JSONResultsReader`, or
+        :class:`splunklib.results.ResultsReader` with ``output_mode='xml'``,
+        on one of ``max_workers`` threads. Results are returned in order, as
+        they would be by a single request, along with the messages of each
+        page. At most ``max_buffered_pages`` pages are held at once, counting
+        the one being returned and those being fetched, which bounds memory.
+
+        Pages are requested through the service's connection pool; give the
+        service a ``pool_size`` of at least ``max_workers`` so that their
+        connections are kept alive.
+
+        This method makes one round trip to read the job's ``resultCount``,
+        and one per page. The results must not be filtered with ``search``,
+        as they are paged by ``resultCount``.
+
+        :param page_size: The number of results per page, at most the
+            server's ``maxresultrows`` setting (the default is 50000).
+        :type page_size: ``integer``
+        :param max_workers: The number of pages fetched at once (the default
+            is 4).
+        :type max_workers: ``integer``
+        :param max_buffered_pages: The number of pages held at once (the
+            default is twice ``max_workers``). With fewer than
+            ``max_workers + 1`` pages, fewer pages are fetched at once.
+        :type max_buffered_pages: ``integer``
+        :param query_params: Additional parameters for :meth:`results`.
+        :type query_params: ``dict``
+
+        :raises ValueError: Raised if the job is not done.
+        :return: An iterator of ``dict`` results and
+            :class:`splunklib.results.Message` objects.
+        """
+        output_mode = query_params.setdefault('output_mode', 'json')
+        readers = {'json': JSONResultsReader, 'xml': ResultsReader}
+        if output_mode not in readers:
+            raise ValueError("Cannot page results with output_mode=%s; use json or xml." % output_mode)
+        if page_size < 1:
+            raise ValueError("page_size must be at least 1.")
+        self.refresh()
+        if self['isDone'] != '1':
+            raise ValueError("Job %s is not done." % self.sid)
+        total = int(self['resultCount'])
+        offset = int(query_params.pop('offset', 0))
+        pages = max((total - offset + page_size - 1) // page_size, 0)
+        reader = readers[output_mode]
+
+        def fetch(page):
+            body = self.results(offset=offset + page * page_size, count=page_size, **query_params)
+            try:
+                return list(reader(body))
+            finally:
+                body.close()
+
+        return _ordered_pages(fetch, pages, max(max_workers, 1), max(max_buffered_pages or 2 * max_workers, 1))
+
     def preview(self, **query_params):
         """Returns a streaming handle to this job's preview search results.
 
@@ -2901,6 +2984,59 @@ class Job(Entity):
         return self
 
 
+def _ordered_pages(fetch, count, max_workers, max_buffered):
+    # Calls fetch(0) ... fetch(count - 1) on up to max_workers threads, and
+    # yields the items of each page in order. A page takes a slot when it is
+    # dispatched and frees it once all its items have been yielded, so at
+    # most max_buffered pages are in flight, waiting or being yielded. Pages
+    # are dispatched in order, so the next page to yield always has a slot.
+    slots = threading.Semaphore(max_buffered)
+    ready = threading.Condition()
+    pages = {}
+    state = {'next': 0, 'stopped': False}
+
+    def work():
+        while True:
+            slots.acquire()
+            with ready:
+                page = state['next']
+                if state['stopped'] or page >= count:
+                    slots.release()
+                    return
+                state['next'] += 1
+            try:
+                result = (fetch(page), None)
+            except BaseException:
+                # Always store a result, or the caller would wait for this page forever
+                result = (None, sys.exc_info())
+            with ready:
+                pages[page] = result
+                ready.notify_all()
+
+    workers = [threading.Thread(target=work) for _ in range(min(max_workers, max_buffered, count))]
+    for worker in workers:
+        worker.daemon = True
+        worker.start()
+    try:
+        for page in range(count):
+            with ready:
+                while page not in pages:
+                    ready.wait()
+                items, error = pages.pop(page)
+            if error is not None:
+                six.reraise(*error)
+            for item in items:
+                yield item
+            del items
+            slots.release()
+    finally:
+        # Stop the workers if the caller stops early, or a page failed
+        with ready:
+            state['stopped'] = True
+        for _ in workers:
+            slots.release()
+
+
 class Jobs(Collection):
     """This class represents a collection of search jobs. Retrieve this
     collection using :meth:`Service.jobs`."""
@@ -2963,6 +3099,10 @@ class Jobs(Collection):
                     print result
             assert rr.is_preview == False
 
+        With ``output_mode="json"``, pass the handle to
+        :class:`splunklib.results.JSONResultsReader` instead, which is much
+        faster.
+
         Running an export search is more efficient as it streams the results
         directly to you, rather than having to write them out to disk and make
         them available later. As soon as results are ready, you will receive
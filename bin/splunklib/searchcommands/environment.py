@@ -17,7 +17,6 @@
 from __future__ import absolute_import, division, print_function, unicode_literals
 
 from logging import getLogger, root, StreamHandler
-from logging.config import fileConfig
 from os import chdir, environ, path
 from splunklib.six.moves import getcwd
 
@@ -97,6 +96,7 @@ def configure_logging(logger_name, filename=None):
         filename = path.realpath(filename)
 
         if filename != _current_logging_configuration_file:
+            from logging.config import fileConfig  # imports logging.handlers; not needed without a configuration file
             working_directory = getcwd()
             chdir(app_root)
             try:
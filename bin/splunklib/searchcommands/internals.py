@@ -24,14 +24,15 @@ try:
 except ImportError:
     from ..ordereddict import OrderedDict
 from splunklib.six.moves import StringIO
+from splunklib.six.moves.collections_abc import MutableMapping
 from itertools import chain
-from splunklib.six.moves import map as imap
+from operator import itemgetter
+from splunklib.six.moves import map as imap, zip as izip
 from json import JSONDecoder, JSONEncoder
 from json.encoder import encode_basestring_ascii as json_encode_string
 from splunklib.six.moves import urllib
 
 import csv
-import gzip
 import os
 import re
 import sys
@@ -454,6 +455,7 @@ class ObjectView(object):
 class Recorder(object):
 
     def __init__(self, path, f):
+        import gzip  # only needed when recording
         self._recording = gzip.open(path + '.gz', 'wb')
         self._file = f
 
@@ -462,37 +464,181 @@ class Recorder(object):
 
     def __iter__(self):
         for line in self._file:
-            self._recording.write(line)
+            self._record(line)
             self._recording.flush()
             yield line
 
     def read(self, size=None):
         value = self._file.read() if size is None else self._file.read(size)
-        self._recording.write(value)
+        self._record(value)
         self._recording.flush()
         return value
 
     def readline(self, size=None):
         value = self._file.readline() if size is None else self._file.readline(size)
         if len(value) > 0:
-            self._recording.write(value)
+            self._record(value)
             self._recording.flush()
         return value
 
     def record(self, *args):
         for arg in args:
-            self._recording.write(arg)
+            self._record(arg)
 
     def write(self, text):
-        self._recording.write(text)
+        self._record(text)
         self._file.write(text)
         self._recording.flush()
 
+    def _record(self, value):
+        # The recording is binary; text read from (or written to) a text file is recorded as UTF-8
+        if isinstance(value, six.text_type):
+            value = value.encode('utf-8')
+        self._recording.write(value)
+
+
+class RecordSchema(object):
+    """ Field names shared by the records of a chunk, with the position of each field's value.
+
+    Fields that are added to any one record are appended to the schema and become available to all of them.
+
+    """
+    __slots__ = ('names', 'positions', '_getter', '_getter_key')
+
+    def __init__(self, names):
+        self.names = list(names)
+        self.positions = dict((name, i) for (i, name) in enumerate(self.names))
+        assert len(self.positions) == len(self.names), 'Field names must be unique'
+        self._getter = self._getter_key = None
+
+    def getter(self, names):
+        """ Returns a function that selects the values of the named fields, in order, from a list of values as long as
+        this schema, or :const:`None` if any of the fields is not part of the schema.
+
+        The function is cached for as long as the same list of names is used and no field is added.
+
+        """
+        key = self._getter_key
+        if key is None or key[0] is not names or key[1] != len(self.names):
+            positions = [self.positions.get(name) for name in names]
+            if None in positions:
+                getter = None
+            elif len(positions) == 1:
+                position = positions[0]
+                getter = lambda values: (values[position],)
+            else:
+                getter = itemgetter(*positions)
+            self._getter, self._getter_key = getter, (names, len(self.names))
+        return self._getter
+
+    def add(self, name):
+        position = self.positions.get(name)
+        if position is None:
+            self.positions[name] = position = len(self.names)
+            self.names.append(name)
+        return position
+
+
+class CompactRecord(MutableMapping):
+    """ A record stored as a list of values with a reference to a `RecordSchema` shared with other records.
+
+    A dict keeps a hash table for each record. Wide chunks of records, that all have the same fields, take much less
+    memory this way. The list of values may be shorter than the schema: fields past its end are absent.
+
+    """
+    __slots__ = ('_schema', '_values')
+
+    _absent = object()
+
+    def __init__(self, schema, values):
+        self._schema = schema
+        self._values = values
+
+    def __contains__(self, name):
+        position = self._schema.positions.get(name)
+        return position is not None and position < len(self._values) and \
+            self._values[position] is not CompactRecord._absent
+
+    def __delitem__(self, name):
+        if name not in self:
+            raise KeyError(name)
+        self._values[self._schema.positions[name]] = CompactRecord._absent
+
+    def __getitem__(self, name):
+        position = self._schema.positions.get(name)
+        if position is not None and position < len(self._values):
+            value = self._values[position]
+            if value is not CompactRecord._absent:
+                return value
+        raise KeyError(name)
+
+    def __iter__(self):
+        absent = CompactRecord._absent
+        return (name for (name, value) in izip(self._schema.names, self._values) if value is not absent)
+
+    def __len__(self):
+        absent = CompactRecord._absent
+        return sum(1 for value in self._values if value is not absent)
+
+    def __repr__(self):
+        return 'CompactRecord(' + repr(dict(self.items())) + ')'
+
+    def __setitem__(self, name, value):
+        position = self._schema.add(name)
+        values = self._values
+        if position < len(values):
+            values[position] = value
+            return
+        if position > len(values):
+            values.extend([CompactRecord._absent] * (position - len(values)))
+        values.append(value)
+
+    def copy(self):
+        return CompactRecord(self._schema, list(self._values))
+
+    def get(self, name, default=None):
+        position = self._schema.positions.get(name)
+        if position is not None and position < len(self._values):
+            value = self._values[position]
+            if value is not CompactRecord._absent:
+                return value
+        return default
+
+    def project(self, names):
+        """ Returns the values of the named fields, in order, with :const:`None` or `CompactRecord._absent` for those
+        that are absent.
+
+        This is how `RecordWriter` reads records, without a call to `get` for each field.
+
+        """
+        schema = self._schema
+        values = self._values
+        getter = schema.getter(names)
+        if getter is not None:
+            if len(values) < len(schema.names):
+                values.extend([CompactRecord._absent] * (len(schema.names) - len(values)))
+            return getter(values)
+        positions = schema.positions
+        absent = CompactRecord._absent
+        count = len(values)
+        projection = []
+        for name in names:
+            position = positions.get(name, count)
+            value = values[position] if position < count else None
+            projection.append(None if value is absent else value)
+        return projection
+
 
 class RecordWriter(object):
 
-    def __init__(self, ofile, maxresultrows=None):
-        self._maxresultrows = 50000 if maxresultrows is None else maxresultrows
+    # Records are flushed in a partial chunk once either limit is reached.  The buffer size is measured in characters;
+    # a maxbuffersize of None means no limit.
+    default_maxresultrows = 50000
+    default_maxbuffersize = 64 * 1024 * 1024
+
+    def __init__(self, ofile, maxresultrows=None, maxbuffersize=None):
+        self._maxresultrows = self.default_maxresultrows if maxresultrows is None else maxresultrows
+        self._maxbuffersize = self.default_maxbuffersize if maxbuffersize is None else maxbuffersize
 
         self._ofile = set_binary_mode(ofile)
         self._fieldnames = None
@@ -507,6 +653,8 @@ class RecordWriter(object):
         self._chunk_count = 0
         self._record_count = 0
         self._total_record_count = 0
+        self._buffer_flush_count = 0
+        self._buffer_flush_size = 0
 
     @property
     def is_flushed(self):
@@ -569,92 +717,130 @@ class RecordWriter(object):
 
         if fieldnames is None:
             self._fieldnames = fieldnames = list(record.keys())
+            self._column_types = [None] * len(fieldnames)
+            self._column_serializers = [None] * len(fieldnames)
             value_list = imap(lambda fn: (str(fn), str('__mv_') + str(fn)), fieldnames)
             self._writerow(list(chain.from_iterable(value_list)))
 
-        get_value = record.get
+        if type(record) is CompactRecord:
+            record_values = record.project(fieldnames)
+        else:
+            record_values = imap(record.get, fieldnames)
+
+        column_types = self._column_types
+        column_serializers = self._column_serializers
+        absent = CompactRecord._absent
         values = []
 
-        for fieldname in fieldnames:
-            value = get_value(fieldname, None)
+        for i, value in enumerate(record_values):
 
-            if value is None:
+            if value is None or value is absent:
                 values += (None, None)
                 continue
 
+            # Values of a field nearly always have the same type, so the serializer for each field is
+            # looked up once and only looked up again when the type changes
             value_t = type(value)
 
-            if issubclass(value_t, (list, tuple)):
+            if value_t is str:
+                values += (value, None)
+                continue
 
-                if len(value) == 0:
-                    values += (None, None)
-                    continue
+            if value_t is not column_types[i]:
+                column_types[i] = value_t
+                column_serializers[i] = RecordWriter._serializers.get(value_t, RecordWriter._serialize_value)
 
-                if len(value) > 1:
-                    value_list = value
-                    sv = ''
-                    mv = '$'
+            values += column_serializers[i](value)
 
-                    for value in value_list:
+        self._writerow(values)
+        self._record_count += 1
 
-                        if value is None:
-                            sv += '\n'
-                            mv += '$;$'
-                            continue
+        if self._record_count >= self._maxresultrows:
+            self.flush(partial=True)
+        elif self._maxbuffersize is not None and self._buffer.tell() >= self._maxbuffersize:
+            # A few large records (e.g., pretty-printed JSON events) can fill memory long before maxresultrows
+            self._buffer_flush_count += 1
+            self._buffer_flush_size += self._buffer.tell()
+            self.flush(partial=True)
 
-                        value_t = type(value)
+    @staticmethod
+    def _serialize_value(value):
+        # Generic serializer:  returns the (single value, encoded multivalue) pair for a field value of
+        # any type, including subclasses of the types in RecordWriter._serializers
 
-                        if value_t is not bytes:
+        if value is None:
+            return None, None
 
-                            if value_t is bool:
-                                value = str(value.real)
-                            elif value_t is six.text_type:
-                                value = value
-                            elif isinstance(value, six.integer_types) or value_t is float or value_t is complex:
-                                value = str(value)
-                            elif issubclass(value_t, (dict, list, tuple)):
-                                value = str(''.join(RecordWriter._iterencode_json(value, 0)))
-                            else:
-                                value = repr(value).encode('utf-8', errors='backslashreplace')
+        value_t = type(value)
 
-                        sv += value + '\n'
-                        mv += value.replace('$', '$$') + '$;$'
+        if issubclass(value_t, (list, tuple)):
+            return RecordWriter._serialize_list(value)
 
-                    values += (sv[:-1], mv[:-2])
-                    continue
+        return RecordWriter._serialize_scalar(value)
 
-                value = value[0]
-                value_t = type(value)
+    @staticmethod
+    def _serialize_scalar(value):
 
-            if value_t is bool:
-                values += (str(value.real), None)
-                continue
+        value_t = type(value)
 
-            if value_t is bytes:
-                values += (value, None)
-                continue
+        if value_t is bool:
+            return str(value.real), None
 
-            if value_t is six.text_type:
-                if six.PY2:
-                    value = value.encode('utf-8')
-                values += (value, None)
-                continue
+        if value_t is bytes:
+            return value, None
 
-            if isinstance(value, six.integer_types) or value_t is float or value_t is complex:
-                values += (str(value), None)
-                continue
+        if value_t is six.text_type:
+            if six.PY2:
+                value = value.encode('utf-8')
+            return value, None
 
-            if issubclass(value_t, dict):
-                values += (str(''.join(RecordWriter._iterencode_json(value, 0))), None)
-                continue
+        if isinstance(value, six.integer_types) or value_t is float or value_t is complex:
+            return str(value), None
 
-            values += (repr(value), None)
+        if issubclass(value_t, dict):
+            return str(''.join(RecordWriter._iterencode_json(value, 0))), None
 
-        self._writerow(values)
-        self._record_count += 1
+        return repr(value), None
 
-        if self._record_count >= self._maxresultrows:
-            self.flush(partial=True)
+    @staticmethod
+    def _serialize_list(value_list):
+
+        if len(value_list) == 0:
+            return None, None
+
+        if len(value_list) == 1:
+            return RecordWriter._serialize_scalar(value_list[0])
+
+        items = [RecordWriter._serialize_item(value) for value in value_list]
+        sv = '\n'.join(items)
+
+        if '$' in sv:
+            items = [value.replace('$', '$$') for value in items]
+
+        return sv, '$' + '$;$'.join(items) + '$'
+
+    @staticmethod
+    def _serialize_item(value):
+        # Serializes one value of a multivalue field
+
+        if value is None:
+            return ''
+
+        value_t = type(value)
+
+        if value_t is bytes or value_t is six.text_type:
+            return value
+
+        if value_t is bool:
+            return str(value.real)
+
+        if isinstance(value, six.integer_types) or value_t is float or value_t is complex:
+            return str(value)
+
+        if issubclass(value_t, (dict, list, tuple)):
+            return str(''.join(RecordWriter._iterencode_json(value, 0)))
+
+        return repr(value).encode('utf-8', errors='backslashreplace')
 
     try:
         # noinspection PyUnresolvedReferences
@@ -684,6 +870,29 @@ class RecordWriter(object):
         del make_encoder
 
 
+# Serializers for the exact types of field values most often written.  Other types (including subclasses of these)
+# use RecordWriter._serialize_value.
+
+RecordWriter._serializers = {
+    bool: lambda value: (str(value.real), None),
+    bytes: lambda value: (value, None),
+    float: lambda value: (str(value), None),
+    dict: RecordWriter._serialize_scalar,
+    list: RecordWriter._serialize_list,
+    tuple: RecordWriter._serialize_list,
+}
+
+for _integer_type in six.integer_types:
+    RecordWriter._serializers[_integer_type] = lambda value: (str(value), None)
+
+if six.PY2:
+    RecordWriter._serializers[six.text_type] = lambda value: (value.encode('utf-8'), None)
+else:
+    RecordWriter._serializers[six.text_type] = lambda value: (value, None)
+
+del _integer_type
+
+
 class RecordWriterV1(RecordWriter):
 
     def flush(self, finished=None, partial=None):
@@ -745,6 +954,47 @@ class RecordWriterV1(RecordWriter):
 
 class RecordWriterV2(RecordWriter):
 
+    # No size limit:  a partial chunk is written with finished set to false, which splunkd does not support in
+    # response to an input chunk (see the TODO in flush)
+    default_maxbuffersize = None
+
+    def __init__(self, ofile, maxresultrows=None, maxbuffersize=None):
+        RecordWriter.__init__(self, ofile, maxresultrows, maxbuffersize)
+        self._write_queue = None
+        self._write_error = None
+        self._writer_thread = None
+
+    def start_pipeline(self, maxsize=2):
+        """ Write chunks from a background thread.
+
+        Chunk bodies are encoded and written, in order, while the caller goes on with the next chunk.  At most
+        `maxsize` chunks wait to be written.  The pipeline is drained when the last chunk is flushed.
+
+        """
+        from splunklib.six.moves.queue import Queue
+        from threading import Thread
+
+        assert self._write_queue is None
+        self._write_queue = Queue(maxsize)
+        self._writer_thread = Thread(target=self._run_pipeline, name='RecordWriterV2')
+        self._writer_thread.daemon = True
+        self._writer_thread.start()
+
+    def stop_pipeline(self):
+        queue = self._write_queue
+        if queue is None:
+            return
+        queue.put(None)
+        self._writer_thread.join()
+        self._write_queue = self._writer_thread = None
+        self._raise_write_error()
+
+    def write(self, data):
+        if self._write_queue is None:
+            RecordWriter.write(self, data)
+        else:
+            self._put_write(RecordWriter.write, self, data)
+
     def flush(self, finished=None, partial=None):
 
         RecordWriter.flush(self, finished, partial)  # validates arguments and the state of this instance
@@ -765,6 +1015,13 @@ class RecordWriterV2(RecordWriter):
             #     ('finished', finished),
             #     ('partial', partial)]
 
+            if self._record_count > 0:
+                inspector['metric.record_writer.chunk'] = (
+                    None, self._chunk_count, self._record_count, self._buffer.tell())
+                if self._buffer_flush_count > 0:
+                    inspector['metric.record_writer.buffer_flushes'] = (
+                        None, self._buffer_flush_count, None, self._buffer_flush_size)
+
             if len(inspector) == 0:
                 inspector = None
 
@@ -780,6 +1037,9 @@ class RecordWriterV2(RecordWriter):
 
         self._finished = finished is True
 
+        if self._finished:
+            self.stop_pipeline()
+
     def write_metadata(self, configuration):
         self._ensure_validity()
 
@@ -806,16 +1066,47 @@ class RecordWriterV2(RecordWriter):
         else:
             metadata_length = 0
 
+        if not (metadata_length > 0 or len(body) > 0):
+            return
+
+        if self._write_queue is None:
+            self._write_body(metadata, metadata_length, body)
+        else:
+            self._put_write(self._write_body, metadata, metadata_length, body)
+
+        self._flushed = False
+
+    def _write_body(self, metadata, metadata_length, body):
+
         if sys.version_info >= (3, 0):
             body = body.encode('utf-8')
         body_length = len(body)
 
-        if not (metadata_length > 0 or body_length > 0):
-            return
-
         start_line = 'chunked 1.0,%s,%s\n' % (metadata_length, body_length)
-        self.write(start_line)
-        self.write(metadata)
-        self.write(body)
+        RecordWriter.write(self, start_line)
+        RecordWriter.write(self, metadata)
+        RecordWriter.write(self, body)
         self._ofile.flush()
-        self._flushed = False
+
+    def _put_write(self, function, *args):
+        self._raise_write_error()
+        self._write_queue.put((function, args))
+
+    def _raise_write_error(self):
+        error = self._write_error
+        if error is not None:
+            six.reraise(*error)
+
+    def _run_pipeline(self):
+        queue = self._write_queue
+        while True:
+            item = queue.get()
+            if item is None:
+                return
+            if self._write_error is not None:
+                continue  # output is broken; drop the rest, the caller raises the error on its next write
+            function, args = item
+            try:
+                function(*args)
+            except BaseException:
+                self._write_error = sys.exc_info()
@@ -29,6 +29,7 @@ except ImportError:
 from copy import deepcopy
 from splunklib.six.moves import StringIO
 from itertools import chain, islice
+from operator import itemgetter
 from splunklib.six.moves import filter as ifilter, map as imap, zip as izip
 from splunklib import six
 if six.PY2:
@@ -44,7 +45,6 @@ from time import time
 from splunklib.six.moves.urllib.parse import unquote
 from splunklib.six.moves.urllib.parse import urlsplit
 from warnings import warn
-from xml.etree import ElementTree
 
 import os
 import sys
@@ -57,6 +57,7 @@ import traceback
 
 from .internals import (
     CommandLineParser,
+    CompactRecord,
     CsvDialect,
     InputHeader,
     Message,
@@ -64,12 +65,19 @@ from .internals import (
     MetadataEncoder,
     ObjectView,
     Recorder,
+    RecordSchema,
     RecordWriterV1,
     RecordWriterV2,
-    json_encode_string)
+    json_encode_string,
+    set_binary_mode)
 
 from . import Boolean, Option, environment
-from ..client import Service
+
+if sys.version_info >= (3, 7):
+    # Plain dicts preserve insertion order and are cheaper to build
+    _Record = dict
+else:
+    _Record = OrderedDict
 
 
 # ----------------------------------------------------------------------------------------------------------------------
@@ -99,6 +107,20 @@ class SearchCommand(object):
 
     """
 
+    # Number of characters of output records that may be buffered before they are flushed as a partial chunk, in
+    # addition to the maxresultrows limit. Derived classes may override this. Default: 64 MiB under protocol version 1,
+    # and no limit under protocol version 2, where splunkd does not support partial chunks yet.
+    maxbuffersize = None
+
+    # Set to True to overlap I/O with processing under protocol version 2. A reader thread reads and decodes the next
+    # chunk while records from the current chunk are processed, and a writer thread writes the output of the previous
+    # chunk. Records must then be safe to process on the main thread while other threads run. Default: False.
+    pipelined = False
+
+    # Set to True to receive records as CompactRecord mappings that share their field names with the rest of their
+    # chunk, instead of dicts. They take much less memory for wide events, but are not dict instances. Default: False.
+    compact_records = False
+
     def __init__(self):
 
         # Variables that may be used, but not altered by derived classes
@@ -322,9 +344,12 @@ class SearchCommand(object):
             del info.msgType
 
         try:
-            info.vix_families = ElementTree.fromstring(info.vix_families)
+            vix_families = info.vix_families
         except AttributeError:
             pass
+        else:
+            from xml.etree import ElementTree  # rarely needed; imported on first use
+            info.vix_families = ElementTree.fromstring(vix_families)
 
         self._search_results_info = info
         return info
@@ -368,6 +393,9 @@ class SearchCommand(object):
         if splunkd_uri is None:
             return None
 
+        # The service layer (client, binding, ssl, http) is only imported by commands that use it
+        from ..client import Service
+
         uri = urlsplit(splunkd_uri, allow_fragments=False)
 
         self._service = Service(
@@ -554,7 +582,7 @@ class SearchCommand(object):
 
         recording = os.path.join(recordings, self.__class__.__name__ + '-' + repr(time()) + '.' + self._metadata.action)
         ifile = Recorder(recording + '.input', ifile)
-        ofile = Recorder(recording + '.output', ofile)
+        ofile = Recorder(recording + '.output', set_binary_mode(ofile))
 
         # Archive the dispatch directory--if it exists--so that it can be used as a baseline in mocks)
 
@@ -581,7 +609,7 @@ class SearchCommand(object):
         class_name = self.__class__.__name__
 
         debug('%s.process started under protocol_version=1', class_name)
-        self._record_writer = RecordWriterV1(ofile)
+        self._record_writer = RecordWriterV1(ofile, maxbuffersize=self.maxbuffersize)
 
         # noinspection PyBroadException
         try:
@@ -693,7 +721,8 @@ class SearchCommand(object):
         # Write search command configuration for consumption by splunkd
         # noinspection PyBroadException
         try:
-            self._record_writer = RecordWriterV2(ofile, getattr(self._metadata.searchinfo, 'maxresultrows', None))
+            self._record_writer = RecordWriterV2(
+                ofile, getattr(self._metadata.searchinfo, 'maxresultrows', None), self.maxbuffersize)
             self.fieldnames = []
             self.options.reset()
 
@@ -772,6 +801,9 @@ class SearchCommand(object):
 
         self._record_writer.write_metadata(self._configuration)
 
+        if self.pipelined:
+            self._record_writer.start_pipeline()
+
         # Execute search command on data passing through the pipeline
         # noinspection PyBroadException
         try:
@@ -904,25 +936,160 @@ class SearchCommand(object):
         except StopIteration:
             return
 
+        for record in self._read_records(reader, fieldnames):
+            yield record
+
+    def _read_records(self, reader, fieldnames):
+        """ Generate records from the rows of a CSV reader, given its header row
+
+        Encoded multivalue columns (``__mv_<name>``) replace the value of ``<name>`` when they are
+        not empty.  The layout of the columns is worked out once, up front.
+
+        """
+        if self.compact_records:
+            return self._read_compact_records(reader, fieldnames)
+        return self._read_dict_records(reader, fieldnames)
+
+    def _read_dict_records(self, reader, fieldnames):
         mv_fieldnames = dict([(name, name[len('__mv_'):]) for name in fieldnames if name.startswith('__mv_')])
 
         if len(mv_fieldnames) == 0:
             for values in reader:
-                yield OrderedDict(izip(fieldnames, values))
+                yield _Record(izip(fieldnames, values))
+            return
+
+        columns = dict((name, i) for (i, name) in reversed(list(enumerate(fieldnames))))
+        plain_indexes = [i for (i, name) in enumerate(fieldnames) if not name.startswith('__mv_')]
+        plain_names = [fieldnames[i] for i in plain_indexes]
+        mv_columns = [(i, mv_fieldnames[name]) for (i, name) in enumerate(fieldnames) if name in mv_fieldnames]
+
+        if len(set(plain_names)) == len(plain_names) and len(plain_names) > 1 and all(
+                columns.get(name, i) < i for (i, name) in mv_columns):
+            # Each multivalue column follows the single column of its field, so the plain values
+            # can be picked by position and the multivalues assigned over them afterwards.
+            plain_values = itemgetter(*plain_indexes)
+            decode_list = self._decode_list
+            column_count = len(fieldnames)
+
+            for values in reader:
+                if len(values) == column_count:
+                    record = _Record(izip(plain_names, plain_values(values)))
+                    for i, name in mv_columns:
+                        value = values[i]
+                        if value:
+                            record[name] = decode_list(value)
+                    yield record
+                else:
+                    yield self._read_record(fieldnames, mv_fieldnames, values)
             return
 
         for values in reader:
-            record = OrderedDict()
-            for fieldname, value in izip(fieldnames, values):
-                if fieldname.startswith('__mv_'):
-                    if len(value) > 0:
-                        record[mv_fieldnames[fieldname]] = self._decode_list(value)
-                elif fieldname not in record:
-                    record[fieldname] = value
-            yield record
+            yield self._read_record(fieldnames, mv_fieldnames, values)
+
+    def _read_compact_records(self, reader, fieldnames):
+        """ Generate the same records as `_read_records`, as `CompactRecord` instances that share one schema
+
+        Rows are used as they are when there are no multivalue columns. Fields are in the order of the header, a field
+        with only a multivalue column taking the place of that column, as they are in dict records.
+
+        """
+        mv_fieldnames = dict([(name, name[len('__mv_'):]) for name in fieldnames if name.startswith('__mv_')])
+        plain_names = [name for name in fieldnames if name not in mv_fieldnames]
+        column_count = len(fieldnames)
+
+        # The position in the row of each field of the schema; fields with only a multivalue column read an absent
+        # value appended to the row
+        names, columns = [], []
+        for i, name in enumerate(fieldnames):
+            if name not in mv_fieldnames:
+                names.append(name)
+                columns.append(i)
+            elif mv_fieldnames[name] not in plain_names:
+                names.append(mv_fieldnames[name])
+                columns.append(column_count)
+
+        if len(set(names)) < len(names):
+            # Duplicate field names; decode as usual and convert
+            schema = RecordSchema([])
+            for record in self._read_dict_records(reader, fieldnames):
+                yield self._compact_record(schema, record)
+            return
+
+        schema = RecordSchema(names)
+
+        if len(mv_fieldnames) == 0:
+            for values in reader:
+                if len(values) > column_count:
+                    del values[column_count:]
+                yield CompactRecord(schema, values)
+            return
+
+        mv_columns = [(i, schema.positions[mv_fieldnames[name]]) for (i, name) in enumerate(fieldnames)
+                      if name in mv_fieldnames]
+        mv_only = column_count in columns
+        absent = CompactRecord._absent
+        record_values = itemgetter(*columns) if len(columns) > 1 else None
+        decode_list = self._decode_list
+
+        for values in reader:
+            if len(values) != column_count:
+                yield self._compact_record(schema, self._read_record(fieldnames, mv_fieldnames, values))
+                continue
+            if mv_only:
+                values.append(absent)
+            if record_values is None:
+                fields = [values[i] for i in columns]
+            else:
+                fields = list(record_values(values))
+            for i, position in mv_columns:
+                value = values[i]
+                if value:
+                    fields[position] = decode_list(value)
+            yield CompactRecord(schema, fields)
+
+    @staticmethod
+    def _compact_record(schema, record):
+        compact_record = CompactRecord(schema, [])
+        for name, value in six.iteritems(record):
+            compact_record[name] = value
+        return compact_record
+
+    def _read_record(self, fieldnames, mv_fieldnames, values):
+        record = _Record()
+        for fieldname, value in izip(fieldnames, values):
+            if fieldname.startswith('__mv_'):
+                if len(value) > 0:
+                    record[mv_fieldnames[fieldname]] = self._decode_list(value)
+            elif fieldname not in record:
+                record[fieldname] = value
+        return record
 
     def _records_protocol_v2(self, ifile):
 
+        if self.pipelined:
+            chunks = self._read_chunks_pipelined(ifile)
+        else:
+            chunks = self._read_chunks(ifile)
+
+        for finished, records in chunks:
+
+            self._record_writer.is_flushed = False
+
+            for record in records:
+                yield record
+
+            if finished:
+                return
+
+            self.flush()
+
+    def _read_chunks(self, ifile):
+        """ Generates (finished, records) for each chunk of records sent by splunkd.
+
+        Records are decoded as they are consumed. Generation stops after the finished chunk, at end of file, or at the
+        first chunk with a body but no header.
+
+        """
         while True:
             result = self._read_chunk(ifile)
 
@@ -936,7 +1103,7 @@ class SearchCommand(object):
                 raise RuntimeError('Expected execute action, not {}'.format(action))
 
             finished = getattr(metadata, 'finished', False)
-            self._record_writer.is_flushed = False
+            records = ()
 
             if len(body) > 0:
                 reader = csv.reader(StringIO(body), dialect=CsvDialect)
@@ -946,26 +1113,46 @@ class SearchCommand(object):
                 except StopIteration:
                     return
 
-                mv_fieldnames = dict([(name, name[len('__mv_'):]) for name in fieldnames if name.startswith('__mv_')])
+                records = self._read_records(reader, fieldnames)
 
-                if len(mv_fieldnames) == 0:
-                    for values in reader:
-                        yield OrderedDict(izip(fieldnames, values))
-                else:
-                    for values in reader:
-                        record = OrderedDict()
-                        for fieldname, value in izip(fieldnames, values):
-                            if fieldname.startswith('__mv_'):
-                                if len(value) > 0:
-                                    record[mv_fieldnames[fieldname]] = self._decode_list(value)
-                            elif fieldname not in record:
-                                record[fieldname] = value
-                        yield record
+            yield finished, records
 
             if finished:
                 return
 
-            self.flush()
+    def _read_chunks_pipelined(self, ifile, maxsize=1):
+        """ Same as `_read_chunks`, with chunks read and decoded ahead of time by a reader thread.
+
+        At most `maxsize` decoded chunks wait to be processed. Errors raised by the reader are raised here, in order.
+
+        """
+        from splunklib.six.moves.queue import Queue
+        from threading import Thread
+
+        queue = Queue(maxsize)
+
+        def read_chunks():
+            # noinspection PyBroadException
+            try:
+                for finished, records in self._read_chunks(ifile):
+                    queue.put((finished, list(records), None))
+            except BaseException:
+                queue.put((None, None, sys.exc_info()))
+            else:
+                queue.put(None)
+
+        reader = Thread(target=read_chunks, name=self.__class__.__name__ + 'Reader')
+        reader.daemon = True  # don't wait for splunkd when processing ends early
+        reader.start()
+
+        while True:
+            item = queue.get()
+            if item is None:
+                return
+            finished, records, error = item
+            if error is not None:
+                six.reraise(*error)
+            yield finished, records
 
     def _report_unexpected_error(self):
 
@@ -0,0 +1,8 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The commands and their vendored libraries are imported from bin, as Splunk does; jpath.py's
+# splunk.Intersplunk is the stand-in from bench
+sys.path[:0] = [os.path.join(ROOT, "bin"), os.path.join(ROOT, "bench")]
@@ -0,0 +1,61 @@
+import asyncio
+
+import pytest
+
+from splunklib import asyncclient, client
+from splunklib.results import Message
+
+from mock_splunkd import MockSplunkd
+
+RESULTS = [{"_time": str(i), "host": "host{}".format(i % 3), "tag": ["a", "b"]} for i in range(230)]
+
+
+@pytest.fixture(scope="module")
+def server():
+    server = MockSplunkd(RESULTS, job_duration=0.2).start()
+    yield server
+    server.stop()
+
+
+def record_offsets(monkeypatch, max_result_rows=None):
+    # Job.results, as if the server returned at most max_result_rows results per request
+    offsets = []
+    results = client.Job.results
+
+    def recording_results(job, **query_params):
+        offsets.append(int(query_params["offset"]))
+        if max_result_rows is not None:
+            query_params["count"] = min(int(query_params["count"]), max_result_rows)
+        return results(job, **query_params)
+
+    monkeypatch.setattr(client.Job, "results", recording_results)
+    return offsets
+
+
+def search(server, **kwargs):
+    async def run():
+        async with asyncclient.AsyncService(scheme="http", host=server.host, port=server.port, token="mock",
+                                            max_concurrency=2) as service:
+            job = await service.create_job("search index=main")
+            await job.wait(poll_interval=0.05)
+            return [item async for item in job.results(**kwargs) if not isinstance(item, Message)]
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("page_size", [1000, 230, 100, 7])
+def test_results_pages_up_to_result_count(server, monkeypatch, page_size):
+    offsets = record_offsets(monkeypatch)
+    assert [dict(item) for item in search(server, page_size=page_size)] == RESULTS
+    assert offsets == list(range(0, len(RESULTS), page_size))
+
+
+def test_results_pages_by_what_the_server_returns(server, monkeypatch):
+    offsets = record_offsets(monkeypatch, max_result_rows=100)
+    assert [dict(item) for item in search(server, page_size=150)] == RESULTS
+    assert offsets == [0, 100, 200]
+
+
+def test_results_from_an_offset(server, monkeypatch):
+    offsets = record_offsets(monkeypatch)
+    assert [dict(item) for item in search(server, page_size=100, offset=30)] == RESULTS[30:]
+    assert offsets == [30, 130]
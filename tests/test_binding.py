@@ -0,0 +1,186 @@
+import errno
+import gzip
+import io
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from splunklib import binding
+
+IDLE_TIMEOUT = 0.2
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    """ Answers every request with its method, closing connections that are idle for IDLE_TIMEOUT """
+    protocol_version = "HTTP/1.1"
+    timeout = IDLE_TIMEOUT
+
+    def setup(self):
+        BaseHTTPRequestHandler.setup(self)
+        self.server.connections += 1
+
+    def _respond(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        body = self.command.encode("ascii")
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = _respond
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+    server.daemon_threads = True
+    server.connections = 0
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def request_handler():
+    request = binding.handler(pool_size=2)
+    yield request
+    request.pool.clear()
+
+
+def call(request_handler, server, method):
+    url = "http://127.0.0.1:{}/services/search/jobs".format(server.server_address[1])
+    response = request_handler(url, {"method": method, "headers": [], "body": "search=x"})
+    return response["body"].read()
+
+
+def test_idle_connection_is_reused(server, request_handler):
+    assert call(request_handler, server, "GET") == b"GET"
+    assert call(request_handler, server, "POST") == b"POST"
+    assert server.connections == 1
+
+
+def test_post_after_idle_timeout_uses_a_new_connection(server, request_handler):
+    assert call(request_handler, server, "GET") == b"GET"
+    time.sleep(IDLE_TIMEOUT * 3)
+    assert call(request_handler, server, "POST") == b"POST"
+    assert server.connections == 2
+
+
+@pytest.mark.parametrize("error", [BrokenPipeError(errno.EPIPE, "Broken pipe"),
+                                   ConnectionResetError(errno.ECONNRESET, "Connection reset")])
+def test_post_is_sent_again_when_sending_on_a_reused_connection_fails(server, request_handler, error):
+    assert call(request_handler, server, "GET") == b"GET"
+    (connection,) = request_handler.pool._idle[("http", "127.0.0.1", server.server_address[1])]
+
+    def request(*args, **kwargs):
+        raise error
+
+    connection.request = request
+    assert call(request_handler, server, "POST") == b"POST"
+    assert server.connections == 2
+
+
+
+BODY = b"".join(b'{"_raw": "event %d", "tags": ["a", "b"]}\n' % i for i in range(5000))
+
+
+def gzip_encode(data):
+    return gzip.compress(data)
+
+
+def raw_deflate_encode(data):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, -zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
+ENCODINGS = [
+    ("gzip", gzip_encode),
+    ("deflate", zlib.compress),
+    ("deflate", raw_deflate_encode),
+]
+
+
+class Response(io.BytesIO):
+    """ Stands in for an HTTPResponse, returning at most 'read_size' bytes per read """
+
+    def __init__(self, data, encoding, read_size=7):
+        io.BytesIO.__init__(self, data)
+        self._encoding = encoding
+        self._read_size = read_size
+
+    def getheader(self, name, default=None):
+        return self._encoding if name == "Content-Encoding" else default
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            return io.BytesIO.read(self)
+        return io.BytesIO.read(self, min(size, self._read_size))
+
+    def isclosed(self):
+        return self.tell() == len(self.getvalue())
+
+
+@pytest.mark.parametrize("encoding, encode", ENCODINGS)
+def test_decompresses_whole_body(encoding, encode):
+    reader = binding.ResponseReader(Response(encode(BODY), encoding))
+    assert reader.read() == BODY
+    assert reader.read() == b""
+
+
+@pytest.mark.parametrize("encoding, encode", ENCODINGS)
+@pytest.mark.parametrize("size", [1, 3, 4096])
+def test_decompresses_small_reads(encoding, encode, size):
+    reader = binding.ResponseReader(Response(encode(BODY), encoding))
+    chunks = []
+    while True:
+        chunk = reader.read(size)
+        if not chunk:
+            break
+        assert len(chunk) <= size
+        chunks.append(chunk)
+    assert b"".join(chunks) == BODY
+    assert reader.empty
+
+
+@pytest.mark.parametrize("encoding, encode", ENCODINGS)
+def test_peek_does_not_consume(encoding, encode):
+    reader = binding.ResponseReader(Response(encode(BODY), encoding))
+    assert reader.peek(5) == BODY[:5]
+    assert reader.peek(5) == BODY[:5]
+    assert not reader.empty
+    assert reader.read(3) == BODY[:3]
+    assert reader.peek(10) == BODY[3:13]
+    assert reader.read() == BODY[3:]
+    assert reader.empty
+
+
+@pytest.mark.parametrize("encoding, encode", ENCODINGS)
+def test_truncated_body_raises(encoding, encode):
+    data = encode(BODY)
+    reader = binding.ResponseReader(Response(data[:len(data) // 2], encoding))
+    with pytest.raises(binding.six.moves.http_client.IncompleteRead):
+        reader.read()
+
+
+@pytest.mark.parametrize("encoding, data", [
+    ("gzip", b"\x1f\x8b\x08\x00 not gzip data at all"),
+    ("gzip", b"plain text"),
+    ("deflate", b"\xff\xfe not deflate data"),
+])
+def test_corrupt_body_raises(encoding, data):
+    reader = binding.ResponseReader(Response(data, encoding))
+    with pytest.raises(zlib.error):
+        reader.read()
+
+
+def test_empty_compressed_body():
+    assert binding.ResponseReader(Response(b"", "gzip")).read() == b""
@@ -0,0 +1,115 @@
+import threading
+import time
+
+import pytest
+
+from splunklib import client
+from splunklib.client import _ordered_pages
+from splunklib.results import Message
+
+from mock_splunkd import MockSplunkd
+
+RESULTS = [{"_time": str(i), "host": "host{}".format(i % 3), "tag": ["a", "b"]} for i in range(230)]
+
+
+class Pages(object):
+    """ Fetches pages of 'size' items, later pages first, tracking how many are held at once """
+
+    def __init__(self, count, size=3, fail=None):
+        self.count = count
+        self.size = size
+        self.fail = fail
+        self.fetched = []
+        self.held = 0
+        self.max_held = 0
+        self._lock = threading.Lock()
+
+    def fetch(self, page):
+        with self._lock:
+            self.fetched.append(page)
+            self.held += 1
+            self.max_held = max(self.max_held, self.held)
+        time.sleep(0.002 * (self.count - page % 4))
+        if page == self.fail:
+            raise RuntimeError("page {}".format(page))
+        return [(page, i) for i in range(self.size)]
+
+    def read(self, max_workers, max_buffered):
+        for item in _ordered_pages(self.fetch, self.count, max_workers, max_buffered):
+            if item[1] == self.size - 1:
+                with self._lock:
+                    self.held -= 1
+            yield item
+
+
+@pytest.mark.parametrize("max_workers, max_buffered", [(1, 1), (4, 2), (4, 8), (8, 100)])
+def test_ordered_pages_yields_pages_in_order(max_workers, max_buffered):
+    pages = Pages(20)
+    assert list(pages.read(max_workers, max_buffered)) == [(page, i) for page in range(20) for i in range(3)]
+    assert sorted(pages.fetched) == list(range(20))
+    assert pages.max_held <= max_buffered
+
+
+def test_ordered_pages_raises_a_failed_page_in_order():
+    pages = Pages(20, fail=5)
+    items = []
+    with pytest.raises(RuntimeError, match="page 5"):
+        for item in pages.read(4, 8):
+            items.append(item)
+    assert items == [(page, i) for page in range(5) for i in range(3)]
+    time.sleep(0.1)
+    # The workers stop once the failure is raised
+    assert len(pages.fetched) < 20
+
+
+def test_ordered_pages_stops_when_the_caller_does():
+    pages = Pages(20)
+    reader = pages.read(4, 4)
+    assert next(reader) == (0, 0)
+    reader.close()
+    time.sleep(0.1)
+    assert len(pages.fetched) <= 5
+
+
+@pytest.fixture(scope="module")
+def server():
+    server = MockSplunkd(RESULTS).start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def service(server):
+    service = client.Service(scheme="http", host=server.host, port=server.port, token="mock", pool_size=4)
+    yield service
+    service.http.close()
+
+
+def record_offsets(monkeypatch):
+    offsets = []
+    results = client.Job.results
+
+    def recording_results(job, **query_params):
+        offsets.append((int(query_params["offset"]), int(query_params["count"])))
+        return results(job, **query_params)
+
+    monkeypatch.setattr(client.Job, "results", recording_results)
+    return offsets
+
+
+@pytest.mark.parametrize("output_mode", ["json", "xml"])
+@pytest.mark.parametrize("page_size", [1000, 230, 50, 7])
+def test_iter_results_pages_up_to_result_count(service, monkeypatch, output_mode, page_size):
+    offsets = record_offsets(monkeypatch)
+    job = service.jobs.create("search index=main")
+    items = [item for item in job.iter_results(page_size, output_mode=output_mode) if not isinstance(item, Message)]
+    assert [dict(item) for item in items] == RESULTS
+    assert sorted(offsets) == [(offset, page_size) for offset in range(0, len(RESULTS), page_size)]
+
+
+def test_iter_results_from_an_offset(service, monkeypatch):
+    offsets = record_offsets(monkeypatch)
+    job = service.jobs.create("search index=main")
+    items = [item for item in job.iter_results(100, offset=30) if not isinstance(item, Message)]
+    assert [dict(item) for item in items] == RESULTS[30:]
+    assert sorted(offsets) == [(30, 100), (130, 100)]
@@ -0,0 +1,16 @@
+import subprocess
+import sys
+
+from import_time import BIN, LAZY
+
+CHECK = """
+import sys
+import splunklib.searchcommands
+print("\\n".join(name for name in sys.argv[1:] if name in sys.modules))
+"""
+
+
+def test_searchcommands_imports_lazily():
+    # A fresh interpreter:  this one has imported everything already
+    output = subprocess.check_output([sys.executable, "-c", CHECK] + LAZY, cwd=BIN, universal_newlines=True)
+    assert output.split() == []
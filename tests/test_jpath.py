@@ -0,0 +1,156 @@
+import sys
+
+import jmespath
+import pytest
+
+import jpath
+from jpath import EMPTY_MATCH, NO_MATCH, JsonInput
+from jpath_prefilter import required_literals
+
+CONSOLE_LOGIN = "Records[?eventName=='ConsoleLogin']"
+
+
+def literals(expression, empty=False):
+    return required_literals(jmespath.compile(expression).parsed, empty)
+
+
+def test_missing_required_literal_is_no_match():
+    json_input = JsonInput(required=literals("foo.b"))
+    assert json_input.loads('{"foo": 1, "bar": 2}') is NO_MATCH
+    assert json_input.skipped == {"nomatch": 1}
+
+
+def test_missing_required_literal_is_not_decoded():
+    json_input = JsonInput(required=literals("foo.b"))
+    assert json_input.loads('{"foo": 1, "trunc') is NO_MATCH
+    assert json_input.skipped == {"nomatch": 1}
+
+
+def test_escaped_text_is_decoded():
+    json_input = JsonInput(required=literals("foo.b"))
+    assert json_input.loads('{"foo": {"\\u0062": 1}}') == {"foo": {"b": 1}}
+
+
+def test_invalid_json_missing_required_literal_is_invalid_when_validated():
+    json_input = JsonInput(required=literals("foo.b"), validate=True)
+    assert json_input.loads('{"foo": 1, "trunc') is None
+    assert json_input.skipped == {"invalid": 1}
+
+
+def test_embedded_invalid_json_missing_required_literal_is_invalid_when_validated():
+    json_input = JsonInput(embedded=True, required=literals("foo.b"), validate=True)
+    assert json_input.loads('<13>Oct 19 host app: {"foo": 1, "trunc') is None
+    assert json_input.skipped == {"invalid": 1}
+
+
+@pytest.mark.parametrize("expression, null, empty", [
+    ("foo.b", {'"foo"', '"b"'}, set()),
+    ("a[*].b", {'"a"'}, {'"b"'}),
+    (CONSOLE_LOGIN, {'"Records"'}, {'"eventName"', '"ConsoleLogin"'}),
+    (CONSOLE_LOGIN + " | [0]", {'"Records"', '"eventName"', '"ConsoleLogin"'}, set()),
+    ("Records[?eventName=='ConsoleLogin' || eventName=='Logout']", {'"Records"'}, {'"eventName"'}),
+    ("Records[?!(eventName=='ConsoleLogin')]", {'"Records"'}, set()),
+    ("Records[?eventName!='ConsoleLogin']", {'"Records"'}, set()),
+    ("length(a)", set(), set()),
+    ("a || b", set(), set()),
+])
+def test_required_literals(expression, null, empty):
+    assert literals(expression) == null
+    assert literals(expression, empty=True) == null | empty
+
+
+DOCUMENTS = [
+    '{"Records": [{"eventName": "ConsoleLogin", "user": "a"}, {"eventName": "Logout"}]}',
+    '{"Records": [{"eventName": "Logout"}, {"eventName": "ConsoleLogout"}]}',
+    '{"Records": [{"eventType": "ConsoleLogin"}]}',
+    '{"Records": []}',
+    '{"records": []}',
+    '{"Records": [{"eventName": "Console\\u004cogin"}]}',
+]
+
+
+@pytest.mark.parametrize("expression", [
+    CONSOLE_LOGIN,
+    CONSOLE_LOGIN + " | [0]",
+    CONSOLE_LOGIN + ".user",
+    "Records[*].eventName",
+    "Records[0].eventName",
+])
+@pytest.mark.parametrize("document", DOCUMENTS)
+def test_prefiltered_output_matches_search(expression, document):
+    jp = jmespath.compile(expression)
+    json_input = JsonInput(required=required_literals(jp.parsed),
+                           nonempty=required_literals(jp.parsed, empty=True))
+    value = json_input.loads(document)
+    if value is NO_MATCH:
+        value = None
+    elif value is EMPTY_MATCH:
+        value = []
+    else:
+        value = jp.search(value)
+    expected = {}
+    actual = {}
+    jpath.output_to_field(jp.search(jpath.json.loads(document)), "out", expected)
+    jpath.output_to_field(value, "out", actual)
+    assert actual == expected
+
+
+def run_jpath(monkeypatch, args, records):
+    output = []
+    monkeypatch.setattr(sys, "argv", ["jpath.py"] + args)
+    monkeypatch.setattr(jpath.si, "getOrganizedResults", lambda: (records, [], {}))
+    monkeypatch.setattr(jpath.si, "outputResults", output.extend)
+    monkeypatch.setattr(jpath.si, "generateErrorResults", pytest.fail)
+    jpath.jpath()
+    return output
+
+
+def test_filter_miss_is_not_decoded(monkeypatch):
+    records = [{"_raw": '{"Records": [{"eventName": "Logout"}], "trunc'},
+               {"_raw": '{"Records": [{"eventName": "ConsoleLogin", "user": "a"}]}'}]
+    decoded = []
+    monkeypatch.setattr(jpath.json, "JSONDecoder", lambda: _RecordingDecoder(decoded))
+    output = run_jpath(monkeypatch, [CONSOLE_LOGIN + ".user", "output=user"], records)
+    assert [record["user"] for record in output] == [None, "a"]
+    assert decoded == [records[1]["_raw"]]
+
+
+class _RecordingDecoder(jpath.json.JSONDecoder):
+
+    def __init__(self, decoded):
+        super(_RecordingDecoder, self).__init__()
+        self._decoded = decoded
+
+    def decode(self, s, *args, **kwargs):
+        self._decoded.append(s)
+        return super(_RecordingDecoder, self).decode(s, *args, **kwargs)
+
+
+def test_invalid_json_is_skipped_with_default(monkeypatch):
+    records = [{"_raw": '{"foo": 1, "trunc'},
+               {"_raw": '{"foo": 1}'},
+               {"_raw": '{"foo": {"b": 2}}'},
+               {"other": "1"}]
+    output = run_jpath(monkeypatch, ["foo.b", "output=b", "default=none"], records)
+    assert [record.get("b") for record in output] == [None, "None", "2", "none"]
+
+
+def test_wildcard_output_ignores_filter_literals(monkeypatch):
+    records = [{"_raw": '{"Records": [{"eventName": "Logout"}]}'},
+               {"_raw": '{"foo": 1}'}]
+    output = run_jpath(monkeypatch, [CONSOLE_LOGIN, "output=out_*"], records)
+    assert output[0]["out_anonymous"] == "[]"
+    assert "out_anonymous" not in output[1]
+
+
+@pytest.mark.parametrize("apply_output, values, size", [
+    (jpath.output_to_field, {"a": 1}, len('{"a": 1}')),
+    (jpath.output_to_field, ["ab", 1], 3),
+    (jpath.output_to_field, [], 0),
+    (jpath.output_to_field, None, len("None")),
+    (jpath.output_to_wildcard, {"a": "xy", "b": 12, "c": [], "d": {"e": 1}}, 2 + 2 + len('{"e": 1}')),
+    (jpath.output_to_wildcard, None, 0),
+])
+def test_output_returns_characters_written(apply_output, values, size):
+    record = {}
+    assert apply_output(values, "out_*" if apply_output is jpath.output_to_wildcard else "out", record) == size
@@ -0,0 +1,122 @@
+import random
+
+import jmespath
+import pytest
+from jmespath.exceptions import ParseError
+from jmespath.parser import Parser
+
+from jpath import jp_options
+from jpath_specialize import Specializer
+
+FIELDS = ["a", "b", "c"]
+
+# {0} and {1} are replaced by subexpressions
+TEMPLATES = [
+    "{0}.{1}", "{0}[*].{1}", "{0}[?{1}].a", "{0}[?{1} == `1`]", "{0}[?{1} > `1`]", "{0}[0]", "{0}[-1]",
+    "{0}[1:]", "{0}[::-1]", "{0}[]", "{0}.*", "{0} | {1}", "{0} || {1}", "{0} && {1}", "!{0}", "{0} == {1}",
+    "{0} != `\"x\"`", "{0} < {1}", "{0} >= `0`", "{{x: {0}, y: {1}}}", "[{0}, {1}]", "length({0})", "keys({0})",
+    "sort({0})", "to_string({0})", "max({0})", "abs({0})", "contains({0}, {1})", "starts_with({0}, `\"a\"`)",
+    "sort_by({0}, &{1})", "max_by({0}, &{1})", "items({0})", "`\"a\"`", "`[1, 2]`", "@",
+]
+
+
+def expression(rng, depth=0):
+    if depth >= 3 or rng.random() < 0.3:
+        return rng.choice(FIELDS)
+    template = rng.choice(TEMPLATES)
+    return template.format(expression(rng, depth + 1), expression(rng, depth + 1))
+
+
+def expressions(rng, count):
+    # jmespath 0.10.0 can't evict from a full cache on Python 3.11 (random.sample of dict keys)
+    Parser.purge()
+    compiled = []
+    while len(compiled) < count:
+        try:
+            compiled.append(jmespath.compile(expression(rng)))
+        except ParseError:
+            pass
+    return compiled
+
+
+def scalar(rng):
+    return rng.choice([None, True, False, 0, 1, -2, 1.5, "", "a", "b1"])
+
+
+def document(rng, depth=0):
+    kind = rng.random()
+    if depth >= 3 or kind < 0.3:
+        return scalar(rng)
+    if kind < 0.65:
+        return [document(rng, depth + 1) for _ in range(rng.randint(0, 3))]
+    return dict((field, document(rng, depth + 1)) for field in rng.sample(FIELDS, rng.randint(0, 3)))
+
+
+def same_shape(rng, value):
+    # Another document with the same types in the same places
+    if isinstance(value, dict):
+        return dict((key, same_shape(rng, item)) for (key, item) in value.items())
+    if isinstance(value, list):
+        return [same_shape(rng, item) for item in value]
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, int):
+        return rng.randint(-3, 3)
+    if isinstance(value, float):
+        return rng.random() * 4 - 2
+    return rng.choice(["", "a", "b1", "c"])
+
+
+def outcome(search, value):
+    try:
+        return search(value)
+    except Exception as e:
+        return type(e)
+
+
+def assert_same(jp, specializer, value):
+    expected = outcome(lambda v: jp.search(v, options=jp_options), value)
+    assert outcome(specializer.search, value) == expected, jp.expression
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_specialized_search_matches_search(seed):
+    rng = random.Random(seed)
+    hits = misses = 0
+    for jp in expressions(rng, 25):
+        specializer = Specializer(jp, options=jp_options, learn_count=5)
+        shape = document(rng)
+        for _ in range(10):
+            assert_same(jp, specializer, same_shape(rng, shape))
+        # Other shapes miss guards (or raise in specialized code) and are searched generically, until
+        # there are too many misses
+        for _ in range(10):
+            assert_same(jp, specializer, document(rng))
+        hits += specializer.hits
+        misses += specializer.misses
+    assert hits > 0 and misses > 0
+
+
+def test_guard_miss_falls_back():
+    jp = jmespath.compile("length(a)")
+    specializer = Specializer(jp, options=jp_options, learn_count=2)
+    assert [specializer.search({"a": "xyz"}) for _ in range(2)] == [3, 3]
+    assert specializer.active
+    assert specializer.search({"a": [1, 2]}) == 2
+    assert (specializer.hits, specializer.misses) == (0, 1)
+    assert specializer.search({"a": "xy"}) == 2
+    assert (specializer.hits, specializer.misses) == (1, 1)
+
+
+def test_stops_specializing_after_learn_count_misses():
+    jp = jmespath.compile("a.b")
+    specializer = Specializer(jp, options=jp_options, learn_count=3)
+    for _ in range(3):
+        specializer.search({"a": {"b": 1}})
+    assert specializer.active
+    for i in range(4):
+        assert specializer.search({"a": [i]}) is None
+    assert not specializer.active
+    assert specializer.misses == 4
+    assert specializer.search({"a": {"b": 2}}) == 2
+    assert (specializer.hits, specializer.misses) == (0, 4)
@@ -0,0 +1,56 @@
+import io
+import json
+
+import pytest
+
+from splunklib.results import JSONResultsReader, Message, ResultsReader
+
+from results_reader import MESSAGES, encode_json, encode_xml
+
+RESULTS = [
+    {"_time": "2021-03-01T12:00:00.000+00:00", "host": "web1", "tag": ["aws", "cloud"],
+     "_raw": '{"a": [1, 2], "b": "<x> & y"}'},
+    {"_time": "2021-03-01T12:00:01.000+00:00", "host": "web2", "tag": "aws", "_raw": "café ☃"},
+    {"_time": "2021-03-01T12:00:02.000+00:00", "host": "web3", "tag": ["a", "b", "c"], "_raw": ""},
+]
+
+
+def read(reader_class, data):
+    reader = reader_class(io.BytesIO(data))
+    items = [item if isinstance(item, Message) else dict(item) for item in reader]
+    return items, reader.is_preview
+
+
+def encode_results(results, messages=MESSAGES, preview=False):
+    """ A single document, as search/jobs/<sid>/results returns it """
+    return json.dumps({"preview": preview, "init_offset": 0,
+                       "messages": [{"type": level, "text": text} for (level, text) in messages],
+                       "fields": [{"name": name} for name in results[0]],
+                       "results": results}).encode("utf-8")
+
+
+@pytest.mark.parametrize("encode", [encode_json, encode_results])
+@pytest.mark.parametrize("preview", [False, True])
+def test_json_reader_matches_xml_reader(encode, preview):
+    expected = read(ResultsReader, encode_xml(RESULTS, preview=preview))
+    assert expected[0][:2] == [Message(level, text) for (level, text) in MESSAGES]
+    assert expected[0][2:] == RESULTS
+    assert expected[1] is preview
+    assert read(JSONResultsReader, encode(RESULTS, preview=preview)) == expected
+
+
+@pytest.mark.parametrize("block_size", [1, 7, 64 * 1024])
+def test_json_reader_reads_documents_across_blocks(monkeypatch, block_size):
+    monkeypatch.setattr(JSONResultsReader, "block_size", block_size)
+    assert read(JSONResultsReader, encode_json(RESULTS)) == read(ResultsReader, encode_xml(RESULTS))
+
+
+def test_json_reader_without_results():
+    assert read(JSONResultsReader, encode_json([], messages=())) == ([], False)
+    assert read(ResultsReader, encode_xml([], messages=())) == ([], False)
+
+
+def test_json_reader_raises_on_truncated_stream():
+    data = encode_json(RESULTS)
+    with pytest.raises(ValueError):
+        read(JSONResultsReader, data[:-20])
@@ -0,0 +1,144 @@
+import csv
+import io
+import json
+
+import pytest
+
+from splunklib.searchcommands import StreamingCommand
+from splunklib.searchcommands.internals import RecordWriterV1, RecordWriterV2
+
+
+class Command(StreamingCommand):
+
+    def stream(self, records):
+        return records
+
+
+HEADER = ['_time', 'a', '__mv_a', '__mv_tags', 'k']
+ROWS = [
+    ['1', 'x', '', '$red$;$blue$', 'one'],
+    ['2', 'y', '$y$;$z$', '', 'two'],
+]
+
+
+def read_records(compact):
+    command = Command()
+    command.compact_records = compact
+    return list(command._read_records(iter([list(row) for row in ROWS]), HEADER))
+
+
+def write_records(records):
+    ofile = io.BytesIO()
+    writer = RecordWriterV1(ofile)
+    writer.write_records(records)
+    writer.flush(finished=True)
+    return list(csv.reader(io.StringIO(ofile.getvalue().decode('utf-8').lstrip('\r\n'))))
+
+
+def read_chunks(data, bodies=None):
+    chunks = []
+    ifile = io.BytesIO(data)
+    while True:
+        line = ifile.readline()
+        if not line:
+            return chunks
+        metadata_length, body_length = (int(n) for n in line.decode('ascii').split(',')[1:])
+        metadata = json.loads(ifile.read(metadata_length).decode('utf-8'))
+        body = ifile.read(body_length)
+        if bodies is not None:
+            bodies.append(body)
+        chunks.append(metadata)
+
+
+def write_records_v2(records):
+    ofile = io.BytesIO()
+    writer = RecordWriterV2(ofile)
+    writer.write_records(records)
+    writer.flush(finished=True)
+    bodies = []
+    read_chunks(ofile.getvalue(), bodies)
+    return bodies
+
+
+def write_chunks(maxbuffersize=None):
+    ofile = io.BytesIO()
+    writer = RecordWriterV2(ofile, maxbuffersize=maxbuffersize)
+    writer.write_records({'_raw': 'x' * 1000} for _ in range(10))
+    writer.flush(finished=True)
+    return read_chunks(ofile.getvalue())
+
+
+def test_v2_writes_one_chunk_by_default():
+    chunks = write_chunks()
+    assert [chunk['finished'] for chunk in chunks] == [True]
+    assert 'metric.record_writer.buffer_flushes' not in chunks[0]['inspector']
+
+
+def test_v2_buffer_flushes_metric():
+    chunks = write_chunks(maxbuffersize=2500)
+    assert [chunk['finished'] for chunk in chunks] == [False, False, False, True]
+    flushes = [chunk['inspector']['metric.record_writer.buffer_flushes'] for chunk in chunks]
+    sizes = [chunk['inspector']['metric.record_writer.chunk'][3] for chunk in chunks]
+    # The number of flushes and the characters they flushed so far
+    assert flushes == [[None, 1, None, sizes[0]],
+                       [None, 2, None, sum(sizes[:2])],
+                       [None, 3, None, sum(sizes[:3])],
+                       [None, 3, None, sum(sizes[:3])]]
+
+
+def test_multivalue_only_field_keeps_its_position():
+    records = read_records(compact=True)
+    assert list(records[0].items()) == [('_time', '1'), ('a', 'x'), ('tags', ['red', 'blue']), ('k', 'one')]
+    assert list(records[1].items()) == [('_time', '2'), ('a', ['y', 'z']), ('k', 'two')]
+    assert [list(record.items()) for record in records] == [list(record.items()) for record in read_records(False)]
+
+
+def test_multivalue_only_field_round_trips():
+    output = write_records(read_records(compact=True))
+    assert output[0] == ['_time', '__mv__time', 'a', '__mv_a', 'tags', '__mv_tags', 'k', '__mv_k']
+    assert output == write_records(read_records(compact=False))
+
+
+def test_compact_record_behaves_like_a_dict():
+    compact, plain = read_records(compact=True)[0], read_records(compact=False)[0]
+    assert compact == plain
+    assert len(compact) == len(plain) == 4
+    assert compact['tags'] == ['red', 'blue']
+    assert compact.get('a') == 'x'
+    assert compact.get('missing') is None
+    assert compact.get('missing', 0) == 0
+    assert 'k' in compact and 'missing' not in compact and '__mv_tags' not in compact
+    with pytest.raises(KeyError):
+        compact['missing']
+
+    compact['new'] = plain['new'] = 'value'
+    compact['a'] = plain['a'] = 'changed'
+    del compact['_time']
+    del plain['_time']
+    assert list(compact.items()) == list(plain.items())
+    assert list(compact.keys()) == ['a', 'tags', 'k', 'new']
+    with pytest.raises(KeyError):
+        del compact['_time']
+
+
+def test_compact_record_new_fields_are_not_shared():
+    first, second = read_records(compact=True)
+    first['new'] = 'value'
+    assert 'new' not in second
+    assert second.get('new') is None
+    assert list(second.items()) == [('_time', '2'), ('a', ['y', 'z']), ('k', 'two')]
+    copy = second.copy()
+    copy['k'] = 'copy'
+    assert second['k'] == 'two'
+
+
+def test_compact_records_write_the_same_v2_output_as_dicts():
+    outputs = []
+    for compact in (True, False):
+        records = read_records(compact)
+        records[1]['new'] = 'value'
+        records[0]['tags'] = ['green']
+        del records[0]['a']
+        outputs.append(write_records_v2(records))
+    assert b'green' in outputs[0][0]
+    assert outputs[0] == outputs[1]